@@ -0,0 +1,230 @@
+"""Benchmark full site builds on synthetic corpora.
+
+Builds a throwaway site with 100, 1,000 and 10,000 generated posts (split
+across the configured languages) next to copies of the real templates,
+static files and language configs, and runs the generator on it with
+--profile. Each size is built cold, again with nothing changed, and once
+more after editing a single post. Builds run offline: Tailwind is not
+invoked and the Open Graph fonts come from OG_FONT_DIR, the user font
+cache, or a system TrueType font copied into the workspace.
+
+Results, including per-stage times from the build profile, are printed
+and written as JSON so runs can be compared.
+
+    python benchmarks/build.py
+    python benchmarks/build.py --sizes 100,1000 --output results.json
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+GENERATOR = os.path.join(ROOT, "src", "generator.py")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from generator import LANGUAGES, FontProvider  # noqa: E402
+
+SYSTEM_FONTS = [
+    "/usr/share/fonts/**/*.ttf",
+    "/Library/Fonts/*.ttf",
+    "/System/Library/Fonts/**/*.ttf",
+    "C:/Windows/Fonts/*.ttf",
+]
+TAGS = [
+    "python", "django", "javascript", "linux", "react", "ai",
+    "docker", "tools", "performance", "terminal", "frontend", "curl",
+]
+WORDS = (
+    "cache build request python server client function module package test "
+    "data query index page template render stream worker process thread "
+    "memory disk network latency throughput profile deploy image style "
+    "script command option config feature error handler parser token"
+).split()
+CODE = {
+    "python": [
+        "def {0}(items):",
+        "    result = []",
+        "    for item in items:",
+        "        if item.{1}:",
+        "            result.append(item)",
+        "    return result",
+    ],
+    "javascript": [
+        "function {0}(items) {{",
+        "  return items.filter((item) => item.{1});",
+        "}}",
+    ],
+    "bash": [
+        "curl -s https://example.com/{0} | jq '.{1}'",
+        "python -m {0} --{1}",
+    ],
+}
+
+
+def sentence(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return " ".join(words).capitalize() + "."
+
+
+def post_body(rng):
+    sections = []
+    for _ in range(rng.randint(4, 10)):
+        sections.append(f"## {sentence(rng, 2, 5)[:-1].title()}")
+        for _ in range(rng.randint(2, 4)):
+            sections.append(" ".join(sentence(rng, 8, 20) for _ in range(rng.randint(3, 6))))
+        if rng.random() < 0.6:
+            language = rng.choice(list(CODE))
+            lines = [line.format(*rng.sample(WORDS, 2)) for line in CODE[language]]
+            sections.append(f"```{language}\n" + "\n".join(lines * rng.randint(1, 3)) + "\n```")
+        if rng.random() < 0.3:
+            sections.append("\n".join(f"- {sentence(rng, 3, 8)}" for _ in range(rng.randint(2, 5))))
+    return "\n\n".join(sections) + "\n"
+
+
+def write_corpus(workspace, total):
+    rng = random.Random(total)
+    per_language = max(1, total // len(LANGUAGES))
+    start = datetime.date(2015, 1, 1)
+    paths = []
+    for lang in LANGUAGES:
+        directory = os.path.join(workspace, "src", "content", lang, "posts")
+        os.makedirs(directory)
+        shutil.copy(
+            os.path.join(ROOT, "src", "content", lang, "config.yaml"),
+            os.path.join(workspace, "src", "content", lang, "config.yaml"),
+        )
+        for index in range(per_language):
+            # Posts on the same day in every language pair up as translations.
+            date = start + datetime.timedelta(days=index)
+            title = sentence(rng, 3, 8)[:-1].title()
+            slug = f"{'-'.join(title.lower().split())}-{index}"
+            tags = rng.sample(TAGS, rng.randint(1, 3))
+            front_matter = "\n".join(
+                [
+                    "---",
+                    f"title: {title}",
+                    f"slug: {slug}",
+                    f"date: {date.isoformat()}",
+                    f"summary: {sentence(rng, 8, 16)}",
+                    f"language: {lang}",
+                    "tags:",
+                    *(f"  - {tag}" for tag in tags),
+                    "---",
+                ]
+            )
+            path = os.path.join(directory, f"{date.isoformat()}-{slug}.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"{front_matter}\n\n{post_body(rng)}")
+            paths.append(path)
+    return paths
+
+
+def font_dir(workspace):
+    try:
+        FontProvider().path("Medium")
+        FontProvider().path("Regular")
+        return None
+    except FileNotFoundError:
+        pass
+    for pattern in SYSTEM_FONTS:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            directory = os.path.join(workspace, "fonts")
+            os.makedirs(directory, exist_ok=True)
+            for style in ("Medium", "Regular"):
+                shutil.copy(path, os.path.join(directory, f"{style}.ttf"))
+            return directory
+    sys.exit("No TrueType font found; set OG_FONT_DIR to a directory with Medium.ttf and Regular.ttf.")
+
+
+def prepare(workspace, total):
+    for name in ("templates", "static", "public"):
+        shutil.copytree(os.path.join(ROOT, "src", name), os.path.join(workspace, "src", name))
+    return write_corpus(workspace, total)
+
+
+def build(workspace, env):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, GENERATOR, "--profile"],
+        cwd=workspace,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    wall = time.perf_counter() - start
+    with open(os.path.join(workspace, ".cache", "profile.json"), encoding="utf-8") as f:
+        profile = json.load(f)
+    return wall, profile
+
+
+def run_size(total, env):
+    results = []
+    with tempfile.TemporaryDirectory() as workspace:
+        paths = prepare(workspace, total)
+        directory = font_dir(workspace)
+        if directory is not None:
+            env = dict(env, OG_FONT_DIR=directory)
+
+        edited = paths[len(paths) // 2]
+        for run in ("cold", "warm", "one post edited"):
+            if run == "one post edited":
+                with open(edited, "a", encoding="utf-8") as f:
+                    f.write("\nOne more paragraph.\n")
+            wall, profile = build(workspace, env)
+            stages = {}
+            for stage in profile["stages"]:
+                name = stage["name"] if stage["language"] is None else f"{stage['name']}[{stage['language']}]"
+                stages[name] = round(stage["wall"], 4)
+            results.append(
+                {
+                    "posts": len(paths),
+                    "run": run,
+                    "wall": round(wall, 3),
+                    "build_wall": round(profile["wall"], 3),
+                    "cpu": round(profile["cpu"], 3),
+                    "posts_per_second": round(len(paths) / wall, 1),
+                    "max_rss_kb": profile["max_rss_kb"],
+                    "stages": stages,
+                }
+            )
+            print(
+                f"{len(paths):>6} posts {run:<16} {wall:8.2f}s "
+                f"{len(paths) / wall:9.1f} posts/s  peak RSS {profile['max_rss_kb']} KB"
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--output", default=os.path.join(ROOT, ".cache", "benchmark.json"))
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONHASHSEED="0")
+    results = []
+    for total in (int(size) for size in args.sizes.split(",")):
+        results.extend(run_size(total, env))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
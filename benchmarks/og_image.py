@@ -0,0 +1,88 @@
+"""Micro-benchmark for the Open Graph image primitives.
+
+Compares the previous per-pixel implementations of the gradient and the
+opacity change against the band operations used by
+OpenGraphImageGenerator, times a full image with cold and warm
+shared layers, and times the PNG encoder with and without optimize.
+
+    python benchmarks/og_image.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from PIL import Image  # noqa: E402
+
+from generator import FontProvider, OpenGraphImageGenerator  # noqa: E402
+
+
+def legacy_gradient(og_image):
+    base = Image.new("RGB", (og_image.WIDTH, og_image.HEIGHT), og_image.TOP_COLOR)
+    top = Image.new("RGB", (og_image.WIDTH, og_image.HEIGHT), og_image.BOTTOM_COLOR)
+    mask = Image.new("L", (og_image.WIDTH, og_image.HEIGHT))
+    mask_data = []
+    for y in range(og_image.HEIGHT):
+        mask_data.extend([int(255 * (y / og_image.HEIGHT))] * og_image.WIDTH)
+    mask.putdata(mask_data)
+    base.paste(top, (0, 0), mask)
+    return base
+
+
+def legacy_image(name, opacity):
+    rgba = Image.open(f"src/static/img/{name}.png").convert("RGBA")
+    for x in range(rgba.width):
+        for y in range(rgba.height):
+            r, g, b, a = rgba.getpixel((x, y))
+            rgba.putpixel((x, y), (r, g, b, int(a * opacity)))
+    return rgba
+
+
+def bench(label, fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+    print(f"{label:<36} {seconds * 1000:9.2f} ms")
+    return seconds
+
+
+def main():
+    og_image = OpenGraphImageGenerator(
+        "en", "benchmark", "Avoid Repetitive Calculations in Python", "example.com", "python"
+    )
+
+    assert legacy_gradient(og_image).tobytes() == og_image.create_gradient().tobytes()
+    assert (
+        legacy_image("python", 0.5).tobytes()
+        == og_image.get_image("python", opacity=0.5).tobytes()
+    )
+
+    bench("gradient (before)", lambda: legacy_gradient(og_image), 5)
+    bench("gradient (after)", og_image.create_gradient, 50)
+    bench("topic opacity (before)", lambda: legacy_image("python", 0.5), 5)
+    bench("topic opacity (after)", lambda: og_image.get_image("python", opacity=0.5), 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, "og.png")
+
+        def cold():
+            OpenGraphImageGenerator._layers.clear()
+            FontProvider._fonts.clear()
+            FontProvider._sizes.clear()
+            og_image.generate(target)
+
+        bench("generate, cold layers and fonts", cold, 5)
+        bench("generate, shared layers and fonts", lambda: og_image.generate(target), 5)
+
+        with Image.open(target) as card:
+            card.load()
+        for label, options in (("encode", {}), ("encode, optimize", {"optimize": True})):
+            buffer = BytesIO()
+            card.save(buffer, "PNG", **options)
+            size = len(buffer.getvalue()) // 1024
+            bench(f"{label} ({size} KB)", lambda: card.save(BytesIO(), "PNG", **options), 5)
+
+
+if __name__ == "__main__":
+    main()
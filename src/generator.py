@@ -1,41 +1,197 @@
+import cProfile
 import datetime
+import filecmp
+import glob
+import gzip
+import hashlib
+import html
+import json
+import math
 import os
 import platform
 import re
 import shutil
+import string
 import subprocess
 import sys
-import xml.dom.minidom
-import xml.etree.ElementTree as ET
+import tempfile
+import time
+import traceback
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from html.parser import HTMLParser
 from io import BytesIO
 
 import markdown
+import pygments
 import requests
 import yaml
 from babel.dates import format_date
-from feedgen.feed import FeedGenerator
-from jinja2 import Environment, FileSystemLoader
+from full_yaml_metadata import FullYamlMetadataPreprocessor
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, meta
+from markupsafe import Markup, escape
 from PIL import Image, ImageDraw, ImageFont
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
 
 
 CURRENT_DATE = datetime.datetime.now()
 CURRENT_YEAR = CURRENT_DATE.year
 DEFAULT_LANG = "en"
 LANGUAGES = ["en", "es"]
+CACHE_DIR = ".cache"
+TEMPLATES_DIR = "src/templates"
+MARKDOWN_EXTENSIONS = ["full_yaml_metadata", "extra"]
+# Code blocks get Pygments CSS classes; each theme's colours are scoped
+# under the selector the dark-mode toggle puts on <html>.
+HIGHLIGHT_STYLES = {".highlight": "github-dark", ".dark .highlight": "one-dark"}
+HIGHLIGHT_OPTIONS = {"wrapcode": True}
+HIGHLIGHT_CACHE_DIR = os.path.join(CACHE_DIR, "highlight")
+HIGHLIGHT_STYLESHEET = "css/highlight.css"
+STYLESHEET_NAME = "css/styles.css"
+STYLESHEET = f"output/static/{STYLESHEET_NAME}"
+TAILWIND_COMMAND = ["npx", "tailwindcss", "-i", "src/input.css"]
+COMPRESS_EXTENSIONS = (".html", ".css", ".js", ".json", ".xml", ".svg", ".txt", ".webmanifest")
+COMPRESS_MIN_SIZE = 1024
+MINIFY_VERSION = 1
+MINIFY_CACHE_DIR = os.path.join(CACHE_DIR, "minify")
+PENDING_PAGES_DIR = os.path.join(CACHE_DIR, "pending")
+
+
+def atomic_write(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp creates owner-only files; outputs must stay readable.
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@lru_cache(maxsize=None)
+def get_markdown():
+    return markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+
+
+def render_markdown(path, cache_paths=None):
+    md = get_markdown()
+    md.reset()
+    with open(path, encoding="utf-8") as f:
+        return highlight_code_blocks(md.convert(f.read()), cache_paths)
+
+
+CODE_BLOCK_RE = re.compile(r'<pre><code class="language-([^"]+)">(.*?)</code></pre>', re.S)
+
+
+def highlight_code(code, language, cache_paths=None):
+    # Highlighted blocks are stored by content, so a block is only lexed
+    # again when its code, language or the highlighter changes. The cache
+    # files used are added to cache_paths.
+    key = hashlib.sha256(
+        json.dumps([code, language, pygments.__version__, HIGHLIGHT_OPTIONS]).encode()
+    ).hexdigest()
+    path = os.path.join(HIGHLIGHT_CACHE_DIR, key[:2], f"{key}.html")
+    try:
+        with open(path, encoding="utf-8") as f:
+            result = f.read()
+    except FileNotFoundError:
+        try:
+            lexer = get_lexer_by_name(language)
+        except ClassNotFound:
+            return None
+        result = highlight(code, lexer, HtmlFormatter(**HIGHLIGHT_OPTIONS))
+        atomic_write(path, result.encode("utf-8"))
+    if cache_paths is not None:
+        cache_paths.append(path)
+    return result
+
+
+def highlight_code_blocks(content, cache_paths=None):
+    def replace(match):
+        result = highlight_code(html.unescape(match.group(2)), match.group(1), cache_paths)
+        return match.group(0) if result is None else result.rstrip("\n")
+
+    return CODE_BLOCK_RE.sub(replace, content)
+
+
+def highlight_stylesheet():
+    rules = []
+    for selector, style in HIGHLIGHT_STYLES.items():
+        # Only the token colours; the block background comes from the
+        # templates.
+        definitions = HtmlFormatter(style=style).get_style_defs(selector)
+        rules.extend(line for line in definitions.splitlines() if line.startswith(f"{selector} ."))
+    return "\n".join(rules) + "\n"
+
+
+@lru_cache(maxsize=None)
+def get_environment():
+    # Compiled templates are kept on disk and reused as long as the
+    # template source checksum matches, so templates are only compiled
+    # again after they change.
+    bytecode_dir = os.path.join(CACHE_DIR, "jinja")
+    os.makedirs(bytecode_dir, exist_ok=True)
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        bytecode_cache=FileSystemBytecodeCache(bytecode_dir),
+    )
 
 
 class Post:
-    def __init__(self, title, slug, date, language, content, summary, tags=[]):
+    __slots__ = (
+        "title",
+        "slug",
+        "date",
+        "language",
+        "summary",
+        "tags",
+        "source",
+        "source_hash",
+        "html_cache",
+        "formatted_date",
+        "translation_key",
+        "highlight_cache",
+    )
+
+    def __init__(self, title, slug, date, language, summary, tags=[], source=None):
         self.title = title
         self.slug = slug
         self.date = date
         self.language = language
-        self.content = content
         self.summary = summary
         self.tags = tags
-        self.html = None
+        self.source = source
+        self.source_hash = None
+        self.html_cache = None
         self.formatted_date = None
+        self.translation_key = None
+        self.highlight_cache = None
 
     @property
     def topic(self):
@@ -43,39 +199,60 @@ class Post:
             return self.tags[0]
         return None
 
-    def process_content(self):
-        if self.html is None:
-            md = markdown.Markdown(extensions=["full_yaml_metadata", "extra"])
-            self.html = md.convert(self.content)
-
-    def render(self, config):
-        env = Environment(loader=FileSystemLoader("src/templates"))
-        post_template = env.get_template("post.html")
-
-        self.process_content()
-
+    @property
+    def html(self):
+        # The body is rendered the first time a page or feed needs it and
+        # is kept on disk, not on the post, so loaded posts only hold
+        # their metadata.
+        try:
+            with open(self.html_cache, encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+        self.highlight_cache = []
+        html = render_markdown(self.source, self.highlight_cache)
+        atomic_write(self.html_cache, html.encode("utf-8"))
+        return html
+
+    def render(self, config, manifest, related=()):
         if self.language == DEFAULT_LANG:
             output_path = os.path.join("output", "articles", self.slug, "index.html")
         else:
             output_path = os.path.join(
                 "output", self.language, "articles", self.slug, "index.html"
             )
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-        with open(output_path, "w", encoding="utf-8") as file:
-            file.write(
-                post_template.render(
-                    post=self,
-                    config=config,
-                    current_year=CURRENT_YEAR,
-                    default_lang=DEFAULT_LANG,
-                    og=OpenGraph(config, self),
-                )
-            )
+        # The cached body is named after the source hash and the Markdown
+        # and Pygments setup, so pages follow upgrades of either.
+        deps = [
+            self.html_cache,
+            manifest.config_hash(self.language),
+            manifest.template_hash("post.html"),
+            manifest.assets.digest,
+            manifest.page_options,
+            [post.source_hash for post in related],
+        ]
+        if manifest.is_current(output_path, deps):
+            return
+
+        manifest.use_cache(output_path, self.html_cache)
+        post_template = get_environment().get_template("post.html")
+
+        manifest.write_page(
+            output_path,
+            post_template.render(
+                post=self,
+                related=related,
+                config=config,
+                current_year=CURRENT_YEAR,
+                default_lang=DEFAULT_LANG,
+                og=OpenGraph(config, self),
+            ),
+            "post",
+            self.language,
+        )
 
-    def generate_og_image(self, config):
-        og_image = OpenGraphImageGenerator(self.language, self.slug, self.title, config.get("site_name"), self.topic)
-        og_image.generate()
+    def og_image(self, config):
+        return OpenGraphImageGenerator(self.language, self.slug, self.title, config.get("site_name"), self.topic)
 
 
 class OpenGraph:
@@ -129,13 +306,86 @@ class OpenGraph:
         return f"@{username}"
 
 
-class OpenGraphImageGenerator:
+class FontProvider:
+    # Fonts are looked up locally, in this order, and never downloaded
+    # during a build. Roboto Medium and Regular ship in src/fonts; run
+    # `python src/generator.py fonts` to fill the user font cache with the
+    # rest of the family.
     FONT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".font_cache/")
+    FONT_DIRS = [os.environ.get("OG_FONT_DIR"), "src/fonts", FONT_CACHE_DIR]
+    FONT_NAME = "Roboto"
+
+    # Loaded fonts and measured text, shared by every image in the process.
+    _fonts = {}
+    _sizes = {}
+
+    def path(self, style):
+        for directory in filter(None, self.FONT_DIRS):
+            path = os.path.join(directory, f"{style}.ttf")
+            if os.path.isfile(path):
+                return path
+        raise FileNotFoundError(
+            f"Font {style}.ttf not found in {', '.join(filter(None, self.FONT_DIRS))}. "
+            "Set OG_FONT_DIR or run `python src/generator.py fonts`."
+        )
+
+    def font(self, style, size):
+        key = (style, size)
+        if key not in self._fonts:
+            self._fonts[key] = ImageFont.truetype(self.path(style), size)
+        return self._fonts[key]
+
+    def text_size(self, font, text):
+        key = (font.path, font.size, text)
+        if key not in self._sizes:
+            self._sizes[key] = font.getsize(text)
+        return self._sizes[key]
+
+    def download(self):
+        font_directory = self.FONT_CACHE_DIR
+        os.makedirs(font_directory, exist_ok=True)
+
+        url = f"https://fonts.google.com/download/list?family={self.FONT_NAME}"
+        response = requests.get(url)
+        response.raise_for_status()
+
+        matches = re.findall(
+            r"\"(https:(?:.*?)\.[ot]tf)\"", str(response.content)
+        )
+        if not matches:
+            raise RuntimeError(
+                f"No font files found for {self.FONT_NAME} at {url}"
+            )
+
+        for match in matches:
+            with requests.get(match) as res:
+                res.raise_for_status()
+
+                with BytesIO(res.content) as fontdata:
+                    font = ImageFont.truetype(fontdata)
+                    name, style = font.getname()
+                    name = " ".join(
+                        [name.replace(self.FONT_NAME, ""), style]
+                    ).strip()
+                    target = os.path.join(font_directory, f"{name}.ttf")
+
+                    with open(target, "wb") as f:
+                        f.write(res.content)
+
+
+class OpenGraphImageGenerator:
+    IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "og")
     WIDTH = 1200
     HEIGHT = 630
     TOP_COLOR = (206, 236, 255)
     BOTTOM_COLOR = (236, 248, 255)
-    FONT_NAME = "Roboto"
+    # Pillow's optimize option saves about 3% per card but makes each one
+    # several times slower to encode, so the default settings are used.
+    PNG_OPTIONS = {}
+    fonts = FontProvider()
+
+    # Layers that are identical for every post, built once per process.
+    _layers = {}
 
     def __init__(self, language, slug, title, site_name, topic):
         self.language = language
@@ -144,17 +394,50 @@ class OpenGraphImageGenerator:
         self.site_name = site_name
         self.topic = topic
 
+    @property
+    def target(self):
+        return os.path.join(
+            f"output/static/img/og/{self.language}", f"{self.slug}.png"
+        )
+
+    def cache_path(self, manifest):
+        # Everything that affects the picture is part of the key, so an
+        # unchanged post reuses the PNG rendered by a previous build.
+        key = [
+            self.title,
+            self.site_name,
+            self.topic,
+            self.WIDTH,
+            self.HEIGHT,
+            self.TOP_COLOR,
+            self.BOTTOM_COLOR,
+            self.PNG_OPTIONS,
+            manifest.file_hash(self.fonts.path("Medium")),
+            manifest.file_hash(self.fonts.path("Regular")),
+            manifest.file_hash("src/static/img/code.png"),
+            manifest.file_hash(f"src/static/img/{self.topic}.png"),
+        ]
+        digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()
+        return os.path.join(self.IMAGE_CACHE_DIR, f"{digest}.png")
+
     def wrap_text(self, text, width, font):
+        # Each word is measured once, so wrapping is linear in the title
+        # length instead of measuring ever-growing prefixes.
         lines = []
-        if font.getsize(text)[0] <= width:
+        if self.fonts.text_size(font, text)[0] <= width:
             lines.append(text)
         else:
             words = text.split(" ")
             i = 0
             while i < len(words):
                 line = ""
-                while i < len(words) and font.getsize(line + words[i])[0] <= width:
+                line_width = 0
+                while (
+                    i < len(words)
+                    and line_width + self.fonts.text_size(font, words[i])[0] <= width
+                ):
                     line = line + words[i] + " "
+                    line_width += self.fonts.text_size(font, words[i] + " ")[0]
                     i += 1
                 if not line:
                     line = words[i]
@@ -172,58 +455,45 @@ class OpenGraphImageGenerator:
         rgba = image.convert("RGBA")
 
         if opacity != 1 and opacity <= 1 and opacity >= 0:
-            for x in range(rgba.width):
-                for y in range(rgba.height):
-                    r, g, b, a = rgba.getpixel((x, y))
-                    rgba.putpixel((x, y), (r, g, b, int(a * opacity)))
+            alpha = rgba.getchannel("A").point(lambda a: int(a * opacity))
+            rgba.putalpha(alpha)
         return rgba
 
-    def download_font(self):
-        font_directory = self.FONT_CACHE_DIR
-
-        if not os.path.isdir(font_directory):
-            os.makedirs(font_directory)
-
-            url = f"https://fonts.google.com/download/list?family={self.FONT_NAME}"
-            response = requests.get(url)
-
-            for match in re.findall(
-                r"\"(https:(?:.*?)\.[ot]tf)\"", str(response.content)
-            ):
-                with requests.get(match) as res:
-                    res.raise_for_status()
-
-                    with BytesIO(res.content) as fontdata:
-                        font = ImageFont.truetype(fontdata)
-                        name, style = font.getname()
-                        name = " ".join(
-                            [name.replace(self.FONT_NAME, ""), style]
-                        ).strip()
-                        target = os.path.join(font_directory, f"{name}.ttf")
-
-                        with open(target, "wb") as f:
-                            f.write(res.content)
+    def shared_image(self, name, thumbnail: tuple = None, opacity=1):
+        key = (name, thumbnail, opacity)
+        if key not in self._layers:
+            try:
+                self._layers[key] = self.get_image(name, thumbnail, opacity)
+            except FileNotFoundError:
+                self._layers[key] = None
+        return self._layers[key]
 
     def create_gradient(self):
         base = Image.new("RGB", (self.WIDTH, self.HEIGHT), self.TOP_COLOR)
         top = Image.new("RGB", (self.WIDTH, self.HEIGHT), self.BOTTOM_COLOR)
-        mask = Image.new("L", (self.WIDTH, self.HEIGHT))
-        mask_data = []
-        for y in range(self.HEIGHT):
-            mask_data.extend([int(255 * (y / self.HEIGHT))] * self.WIDTH)
-        mask.putdata(mask_data)
+        # Build a single column of the mask and stretch it horizontally.
+        column = bytes(int(255 * (y / self.HEIGHT)) for y in range(self.HEIGHT))
+        mask = Image.frombytes("L", (1, self.HEIGHT), column).resize(
+            (self.WIDTH, self.HEIGHT), Image.NEAREST
+        )
         base.paste(top, (0, 0), mask)
         return base
 
-    def generate(self):
-        self.download_font()
-        img = self.create_gradient().convert("RGBA")
+    def shared_gradient(self):
+        key = ("gradient", self.WIDTH, self.HEIGHT, self.TOP_COLOR, self.BOTTOM_COLOR)
+        if key not in self._layers:
+            self._layers[key] = self.create_gradient().convert("RGBA")
+        return self._layers[key]
+
+    def generate(self, target=None):
+        target = target or self.target
+        img = self.shared_gradient().copy()
         d = ImageDraw.Draw(img)
 
-        title_font = ImageFont.truetype(self.FONT_CACHE_DIR + "Medium.ttf", 70)
-        site_font = ImageFont.truetype(self.FONT_CACHE_DIR + "Regular.ttf", 30)
+        title_font = self.fonts.font("Medium", 70)
+        site_font = self.fonts.font("Regular", 30)
 
-        code_logo = self.get_image("code", (120, 120))
+        code_logo = self.shared_image("code", (120, 120))
         img.paste(code_logo, (45, 50), code_logo)
 
         title_lines = self.wrap_text(self.title, 0.8 * self.WIDTH - 2 * 50, title_font)
@@ -233,137 +503,1453 @@ class OpenGraphImageGenerator:
 
         for line in title_lines:
             d.text((50, title_y), line, fill="#252525", font=title_font)
-            title_y += title_font.getsize("A")[1] + line_spacing
+            title_y += self.fonts.text_size(title_font, "A")[1] + line_spacing
         site_x = 50
-        site_y = self.HEIGHT - site_font.getsize("A")[1] - 50
+        site_y = self.HEIGHT - self.fonts.text_size(site_font, "A")[1] - 50
 
         d.text((site_x, site_y), self.site_name, fill="#585858", font=site_font)
 
         if self.topic:
-            try:
-                topic_image = self.get_image(self.topic, opacity=0.5)
+            topic_image = self.shared_image(self.topic, opacity=0.5)
+            if topic_image is not None:
                 img.paste(topic_image, (894, 324), topic_image)
-            except FileNotFoundError:
-                pass
-        target = os.path.join(
-            f"output/static/img/og/{self.language}", f"{self.slug}.png"
+        buffer = BytesIO()
+        img.save(buffer, "PNG", **self.PNG_OPTIONS)
+        atomic_write(target, buffer.getvalue())
+
+
+def render_og_image(job):
+    og_image, target = job
+    start = time.perf_counter()
+    og_image.generate(target)
+    return time.perf_counter() - start
+
+
+def generate_og_images(og_images, manifest, max_workers=None):
+    reused = 0
+    pending = {}
+    for og_image in og_images:
+        cache_path = og_image.cache_path(manifest)
+        manifest.use_cache(og_image.target, cache_path)
+        if manifest.is_current(og_image.target, [cache_path]):
+            reused += 1
+        elif os.path.exists(cache_path):
+            reused += 1
+            manifest.copy(cache_path, og_image.target)
+        else:
+            pending.setdefault(cache_path, []).append(og_image)
+
+    jobs = [(images[0], cache_path) for cache_path, images in pending.items()]
+    if len(jobs) > 1 and max_workers != 1:
+        # Queued outputs are written before the pool forks, so no writer
+        # thread is mid-write in the children.
+        manifest.writer.flush()
+        with ProcessPoolExecutor(max_workers) as executor:
+            timings = list(executor.map(render_og_image, jobs))
+    else:
+        timings = list(map(render_og_image, jobs))
+
+    for (cache_path, images), seconds in zip(pending.items(), timings):
+        for og_image in images:
+            manifest.profiler.record_post(og_image.language, og_image.slug, "og", seconds)
+            manifest.copy(cache_path, og_image.target)
+
+    print(f"OG images: {reused} reused, {len(jobs)} rendered")
+
+
+class OutputWriter:
+    CHANGES_PATH = os.path.join(CACHE_DIR, "changes.json")
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor()
+        self.reset()
+
+    def reset(self):
+        self.pending = []
+        self.changes = {"added": [], "changed": [], "removed": []}
+        self.unchanged = 0
+        self.submitted = 0
+
+    def write(self, path, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.submitted += len(data)
+        self.pending.append(self.executor.submit(self.write_file, path, data))
+
+    def copy(self, src_path, path):
+        self.submitted += os.path.getsize(src_path)
+        self.pending.append(self.executor.submit(self.copy_file, src_path, path))
+
+    def copy_file(self, src_path, path):
+        with open(src_path, "rb") as f:
+            return self.write_file(path, f.read())
+
+    def link(self, src_path, path, changed=True):
+        self.submitted += os.path.getsize(src_path)
+        self.pending.append(self.executor.submit(self.link_file, src_path, path, changed))
+
+    def link_file(self, src_path, path, changed=True):
+        # Files that do not change between builds are hard-linked instead
+        # of copied. The link is made next to the target and renamed over
+        # it, and filesystems without hard links get a copy.
+        try:
+            if os.path.samefile(src_path, path):
+                # The link already shows the source's content; it only
+                # changed if the source was edited in place since the last
+                # build.
+                return ("changed", path) if changed else None
+            if filecmp.cmp(src_path, path, shallow=False):
+                return None
+            status = "changed"
+        except FileNotFoundError:
+            status = "added"
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.link")
+        try:
+            os.link(src_path, tmp_path)
+        except OSError:
+            return self.copy_file(src_path, path)
+        os.replace(tmp_path, path)
+        return status, path
+
+    def write_file(self, path, data):
+        # Identical files are left untouched so their mtime is kept and
+        # they do not show up in the deploy diff.
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == len(data) and f.read() == data:
+                    return None
+            status = "changed"
+        except FileNotFoundError:
+            status = "added"
+        atomic_write(path, data)
+        return status, path
+
+    def move(self, tmp_path, path):
+        self.submitted += os.path.getsize(tmp_path)
+        self.pending.append(self.executor.submit(self.move_file, tmp_path, path))
+
+    def move_file(self, tmp_path, path):
+        # A file written elsewhere in the output directory replaces path,
+        # unless the two are identical.
+        try:
+            if filecmp.cmp(tmp_path, path, shallow=False):
+                os.remove(tmp_path)
+                return None
+            status = "changed"
+        except FileNotFoundError:
+            status = "added"
+        os.replace(tmp_path, path)
+        return status, path
+
+    def remove(self, path):
+        os.remove(path)
+        self.changes["removed"].append(path)
+
+    def flush(self):
+        for future in self.pending:
+            result = future.result()
+            if result is None:
+                self.unchanged += 1
+            else:
+                status, path = result
+                self.changes[status].append(path)
+        self.pending = []
+        return self.changes
+
+    def merge(self, changes, unchanged, submitted):
+        for status, paths in changes.items():
+            self.changes[status].extend(paths)
+        self.unchanged += unchanged
+        self.submitted += submitted
+
+    def save(self):
+        for paths in self.changes.values():
+            paths.sort()
+        atomic_write(self.CHANGES_PATH, json.dumps(self.changes, indent=1).encode())
+
+
+class Assets:
+    # Static files are published under their own name and under a
+    # content-hashed name; templates link to the hashed one through
+    # asset() so it can be cached forever.
+    SOURCE_DIR = "src/static"
+    OUTPUT_DIR = os.path.join("output", "static")
+    URL_PREFIX = "/static/"
+    MANIFEST = os.path.join(OUTPUT_DIR, "assets.json")
+    # The raster images listed under responsive_images in the config also
+    # get resized variants, in every format Pillow can write, for picture()
+    # to list in srcset.
+    IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+    IMAGE_WIDTHS = (32, 64, 128, 256, 512)
+    IMAGE_FORMATS = {
+        "AVIF": ("image/avif", {"quality": 60}),
+        "WEBP": ("image/webp", {"quality": 80, "method": 6}),
+    }
+    IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
+
+    def __init__(self):
+        self.names = {}
+        self.variants = {}
+        self.image_jobs = []
+
+    def add(self, name, digest):
+        root, ext = os.path.splitext(name)
+        self.names[name] = f"{root}.{digest[:8]}{ext}"
+        return self.path(name)
+
+    def path(self, name):
+        return os.path.join(self.OUTPUT_DIR, self.names[name])
+
+    def add_variants(self, name, src_path, digest, widths):
+        root, ext = os.path.splitext(name)
+        if ext.lower() not in self.IMAGE_EXTENSIONS:
+            return
+        with Image.open(src_path) as image:
+            source_width = image.width
+        widths = [width for width in widths if width < source_width]
+        widths.append(source_width)
+
+        Image.init()
+        self.variants[name] = {}
+        for fmt, (mime, options) in self.IMAGE_FORMATS.items():
+            if fmt not in Image.SAVE:
+                continue
+            extension = fmt.lower()
+            srcset = []
+            for width in widths:
+                key = hashlib.sha256(
+                    json.dumps([digest, width, fmt, options]).encode()
+                ).hexdigest()
+                variant = f"{root}.{width}w.{key[:8]}.{extension}"
+                cache_path = os.path.join(self.IMAGE_CACHE_DIR, f"{key}.{extension}")
+                path = os.path.join(self.OUTPUT_DIR, variant)
+                self.image_jobs.append((src_path, width, fmt, cache_path, path))
+                srcset.append(f"{self.URL_PREFIX}{variant} {width}w")
+            self.variants[name][mime] = ", ".join(srcset)
+
+    def name(self, url):
+        if url.startswith(self.URL_PREFIX):
+            return url[len(self.URL_PREFIX):]
+        return url
+
+    def url(self, name):
+        name = self.name(name)
+        return self.URL_PREFIX + self.names.get(name, name)
+
+    def picture(self, name, size, alt="", **attrs):
+        # size is the displayed width in CSS pixels; the browser picks
+        # the variant that matches it at the screen's pixel density.
+        name = self.name(name)
+        sources = "".join(
+            f'<source type="{mime}" srcset="{srcset}" sizes="{size}px">'
+            for mime, srcset in self.variants.get(name, {}).items()
         )
-        os.makedirs(os.path.dirname(target), exist_ok=True)
-        img.save(target, "PNG")
-
-
-def generate_rss(posts, config):
-    site_url = f"http://{config.get('domain')}"
-    if config.get("language") != DEFAULT_LANG:
-        site_url = f"http://{config.get('domain')}/{config.get('language')}"
-
-    fg = FeedGenerator()
-    fg.id(site_url)
-    fg.title(config.get("site_title"))
-    fg.author({"name": config.get("author_name"), "email": config.get("author_email")})
-    fg.link(href=site_url, rel="alternate")
-    fg.subtitle(config.get("site_description"))
-    fg.language(config.get("language"))
-
-    for post in sorted(posts, key=lambda post: post.date, reverse=True):
-        post_url = f"/{site_url}/articles/{post.slug}"
-        fe = fg.add_entry(order="append")
-        fe.id(post_url)
-        fe.title(post.title)
-        fe.link(href=post_url)
-        post.process_content()
-        fe.content(content=post.html)
-        if post.topic is not None:
-            fe.category(term=post.topic)
-        fe.description(post.summary)
-        fe.pubDate(post.date)
+        attrs = {"src": self.url(name), "alt": alt, **attrs}
+        img = " ".join(f'{key}="{escape(value)}"' for key, value in attrs.items())
+        return Markup(f"<picture>{sources}<img {img}></picture>")
 
-    xml = fg.rss_str(pretty=True)
+    @property
+    def digest(self):
+        return hashlib.sha256(
+            json.dumps([self.names, self.variants], sort_keys=True).encode()
+        ).hexdigest()
+
+
+# Elements whose content is kept byte for byte.
+HTML_PRESERVE_RE = re.compile(r"<(pre|code|script|style|textarea)\b.*?</\1\s*>", re.S | re.I)
+HTML_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.S)
+HTML_WHITESPACE_RE = re.compile(r"\s+")
+# Whitespace around these tags never renders, so it is dropped entirely;
+# elsewhere it is collapsed to one space.
+HTML_BLOCK_TAG_RE = re.compile(
+    r"\s*(</?(?:!doctype|html|head|body|meta|link|title|header|main|footer|nav|section|"
+    r"article|aside|div|p|h[1-6]|ul|ol|li|dl|dt|dd|table|thead|tbody|tr|th|td|form|br|hr|"
+    r"path|circle)\b[^>]*>)\s*",
+    re.I,
+)
+
+
+def minify_html_text(content):
+    content = HTML_COMMENT_RE.sub("", content)
+    content = HTML_WHITESPACE_RE.sub(" ", content)
+    return HTML_BLOCK_TAG_RE.sub(r"\1", content)
+
+
+def minify_html(content):
+    parts = []
+    position = 0
+    for match in HTML_PRESERVE_RE.finditer(content):
+        parts.append(minify_html_text(content[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(minify_html_text(content[position:]))
+    return "".join(parts).strip() + "\n"
+
+
+def minify_page(content):
+    # Returns the minified page and the cache file it is kept in.
+    key = hashlib.sha256(f"{MINIFY_VERSION}:{content}".encode("utf-8")).hexdigest()
+    path = os.path.join(MINIFY_CACHE_DIR, key[:2], f"{key}.html")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read(), path
+    except FileNotFoundError:
+        pass
+    result = minify_html(content)
+    atomic_write(path, result.encode("utf-8"))
+    return result, path
+
+
+def report_minified(stats):
+    if not stats:
+        return
+    pages = sum(stat["pages"] for stat in stats.values())
+    saved = sum(stat["size"] - stat["minified"] for stat in stats.values())
+    print(f"Minified {pages} pages, saved {saved / 1024:.0f} KB")
+    for kind, stat in sorted(stats.items()):
+        print(
+            f"  {kind}: {stat['pages']} pages, {stat['size'] / 1024:.0f} KB, "
+            f"saved {(stat['size'] - stat['minified']) / 1024:.0f} KB "
+            f"({1 - stat['minified'] / stat['size']:.1%})"
+        )
 
-    if config["language"] == DEFAULT_LANG:
-        filename = os.path.join("output", "rss.xml")
-    else:
-        filename = os.path.join("output", config.get("language"), "rss.xml")
 
-    with open(filename, "wb") as f:
-        f.write(xml)
+def finish_page(content, css, minify):
+    # Returns the page with its critical CSS inlined and minified, its size
+    # before minifying and the minify cache file.
+    if css is not None:
+        content = CriticalCss.inline(content, css)
+    size = len(content.encode("utf-8"))
+    cache_path = None
+    if minify:
+        content, cache_path = minify_page(content)
+    return content, size, cache_path
+
+
+def finish_pending_page(job):
+    tmp_path, css, minify = job
+    with open(tmp_path, encoding="utf-8") as f:
+        content = f.read()
+    os.remove(tmp_path)
+    return finish_page(content, css, minify)
+
+
+class AboveTheFoldParser(HTMLParser):
+    # Collects the tags and classes of everything before <main> and of the
+    # first elements inside it.
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+        self.in_main = False
+        self.count = 0
+        self.tags = {"html", "body"}
+        self.classes = set()
+
+    def handle_starttag(self, tag, attrs):
+        if self.in_main:
+            if self.count >= self.limit:
+                return
+            self.count += 1
+        elif tag == "main":
+            self.in_main = True
+        self.tags.add(tag)
+        for name, value in attrs:
+            if name == "class" and value:
+                self.classes.update(value.split())
+
+
+class CriticalCss:
+    # The rules of the stylesheet that a page's first screen uses, inlined
+    # so the full stylesheet can load without blocking rendering. They are
+    # worked out from the first page of each template rendered in each
+    # language and cached by template and stylesheet hash.
+    VERSION = 1
+    CACHE_DIR = os.path.join(CACHE_DIR, "critical")
+    FOLD_ELEMENTS = 60
+    # Set on <html> by theme.js before the page is painted.
+    ALWAYS_USED = {"dark"}
+    TEMPLATES = {
+        "post": "post.html",
+        "articles": "articles.html",
+        "tags": "articles.html",
+        "home": "home.html",
+        "projects": "projects.html",
+        "404": "404.html",
+    }
+    LINK_RE = re.compile(r'<link rel="stylesheet" href="([^"]+)" data-critical>')
+    INTERACTIVE_RE = re.compile(r":(?:hover|focus|focus-visible|focus-within|active|visited)\b")
+    CLASS_RE = re.compile(r"\.((?:\\[0-9a-fA-F]{1,6}\s?|\\.|[\w-])+)")
+    ESCAPE_RE = re.compile(r"\\([0-9a-fA-F]{1,6}\s?|.)")
+    ATTRIBUTE_RE = re.compile(r"\[[^\]]*\]")
+    PSEUDO_RE = re.compile(r"::?[\w-]+(?:\([^()]*\))?")
+    TAG_RE = re.compile(r"[a-z][a-z0-9]*")
+
+    def __init__(self, path, digest):
+        # digest identifies the stylesheet, which may still be being built.
+        self.path = path
+        self.digest = digest
+        self.rules = None
+        self.results = {}
+        # The cache file each result is kept in.
+        self.paths = {}
+
+    @classmethod
+    def load(cls, path, digest=None):
+        if not os.path.isfile(path):
+            return None
+        if digest is None:
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        return cls(path, digest)
+
+    def __getstate__(self):
+        # Workers parse the stylesheet themselves.
+        return {"path": self.path, "digest": self.digest, "rules": None, "results": {}, "paths": {}}
+
+    @staticmethod
+    def split_blocks(css):
+        blocks = []
+        depth = 0
+        start = 0
+        prelude_end = 0
+        quote = None
+        for index, char in enumerate(css):
+            if quote:
+                if char == quote and css[index - 1] != "\\":
+                    quote = None
+            elif char in "\"'":
+                quote = char
+            elif char == "{":
+                if depth == 0:
+                    prelude_end = index
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    blocks.append((css[start:prelude_end].strip(), css[prelude_end + 1:index]))
+                    start = index + 1
+            elif char == ";" and depth == 0:
+                start = index + 1
+        return blocks
+
+    @staticmethod
+    def split_selectors(prelude):
+        selectors = []
+        depth = 0
+        start = 0
+        for index, char in enumerate(prelude):
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif char == "," and depth == 0:
+                selectors.append(prelude[start:index])
+                start = index + 1
+        selectors.append(prelude[start:])
+        return selectors
+
+    @staticmethod
+    def remove_negations(selector):
+        while ":not(" in selector:
+            start = selector.index(":not(")
+            depth = 0
+            for index in range(start + 4, len(selector)):
+                if selector[index] == "(":
+                    depth += 1
+                elif selector[index] == ")":
+                    depth -= 1
+                    if depth == 0:
+                        break
+            selector = selector[:start] + selector[index + 1:]
+        return selector
+
+    def requirements(self, selector):
+        # The classes and elements a selector needs to match anything,
+        # or None for rules that only apply after user interaction.
+        if self.INTERACTIVE_RE.search(selector):
+            return None
+        selector = self.remove_negations(selector)
+        classes = frozenset(
+            self.ESCAPE_RE.sub(self.unescape, name) for name in self.CLASS_RE.findall(selector)
+        )
+        selector = self.ATTRIBUTE_RE.sub(" ", self.CLASS_RE.sub(" ", selector))
+        selector = re.sub(r":(?:where|is)\(", " ", selector)
+        tags = frozenset(self.TAG_RE.findall(self.PSEUDO_RE.sub(" ", selector)))
+        return classes, tags
+
+    @staticmethod
+    def unescape(match):
+        escape = match.group(1)
+        if len(escape) > 1 or escape in string.hexdigits:
+            return chr(int(escape, 16))
+        return escape
+
+    def parse(self, css):
+        # Conditional groups keep their nested rules; other at-rules such
+        # as @keyframes and @font-face are left to the full stylesheet.
+        rules = []
+        for prelude, body in self.split_blocks(css):
+            if prelude.startswith(("@media", "@supports")):
+                rules.append((prelude, self.parse(body), None))
+            elif not prelude.startswith("@"):
+                selectors = map(self.requirements, self.split_selectors(prelude))
+                rules.append((prelude, body, [needed for needed in selectors if needed is not None]))
+        return rules
+
+    def select(self, rules, classes, tags):
+        css = []
+        for prelude, body, selectors in rules:
+            if selectors is None:
+                body = self.select(body, classes, tags)
+                if body:
+                    css.append(f"{prelude}{{{body}}}")
+            elif any(needed <= classes and needed_tags <= tags for needed, needed_tags in selectors):
+                css.append(f"{prelude}{{{body}}}")
+        return "".join(css)
+
+    def extract(self, content):
+        if self.rules is None:
+            with open(self.path, encoding="utf-8") as f:
+                css = re.sub(r"/\*.*?\*/", "", f.read(), flags=re.S)
+            self.rules = self.parse(css)
+        parser = AboveTheFoldParser(self.FOLD_ELEMENTS)
+        parser.feed(content)
+        return self.select(self.rules, parser.classes | self.ALWAYS_USED, parser.tags)
+
+    def css(self, content, kind, language, manifest):
+        key = (kind, language)
+        if key not in self.results:
+            digest = hashlib.sha256(
+                json.dumps(
+                    [self.VERSION, kind, language, manifest.template_hash(self.TEMPLATES[kind]), self.digest]
+                ).encode()
+            ).hexdigest()
+            path = os.path.join(self.CACHE_DIR, f"{digest}.css")
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.results[key] = f.read()
+            except FileNotFoundError:
+                self.results[key] = self.extract(content)
+                atomic_write(path, self.results[key].encode("utf-8"))
+            self.paths[key] = path
+        return self.results[key]
+
+    @classmethod
+    def inline(cls, content, css):
+        match = cls.LINK_RE.search(content)
+        if match is None:
+            return content
+        href = match.group(1)
+        tags = (
+            f"<style>{css}</style>"
+            f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{href}"></noscript>'
+        )
+        return content[:match.start()] + tags + content[match.end():]
+
+
+class BuildManifest:
+    PATH = os.path.join(CACHE_DIR, "manifest.json")
+    VERSION = 1
+
+    def __init__(self, clean=False, previous=None, minify=True, previous_cache_refs=None):
+        data = {}
+        if previous is None:
+            data = {} if clean else self.load()
+            previous = data.get("outputs", {})
+        self.previous = previous
+        self.previous_digests = data.get("digests", {})
+        self.digests = {}
+        # The cache files each output, or cache file, was made from.
+        self.previous_cache_refs = previous_cache_refs or data.get("cache_refs", {})
+        self.cache_refs = {}
+        self.minify = minify
+        self.minified = {}
+        self.critical = None
+        self.pending_pages = None
+        self.outputs = {}
+        self.hashes = {}
+        self.template_hashes = {}
+        self.rebuilt = 0
+        self.writer = OutputWriter()
+        self.assets = Assets()
+        self.profiler = BuildProfiler()
+        self.salt = [
+            self.VERSION,
+            CURRENT_YEAR,
+            self.file_hash(os.path.abspath(__file__)),
+        ]
+
+    def begin(self):
+        # Start another build on top of the last one, as the dev server does.
+        # File hashes are recomputed since any input may have been edited.
+        self.previous = self.outputs
+        self.outputs = {}
+        self.previous_digests = self.digests
+        self.digests = {}
+        self.previous_cache_refs = self.cache_refs
+        self.cache_refs = {}
+        self.hashes = {}
+        self.template_hashes = {}
+        self.rebuilt = 0
+        self.minified = {}
+        self.writer.reset()
+        self.assets = Assets()
+
+    def abort(self):
+        self.writer.flush()
+        self.outputs = self.previous
+        self.digests = self.previous_digests
+        self.cache_refs = self.previous_cache_refs
+
+    def keep(self, path):
+        # Carry over an output this build does not produce itself.
+        if path in self.previous:
+            self.outputs[path] = self.previous[path]
+        if path in self.previous_digests:
+            self.digests[path] = self.previous_digests[path]
+        if path in self.previous_cache_refs:
+            self.cache_refs[path] = list(self.previous_cache_refs[path])
+
+    def load(self):
+        try:
+            with open(self.PATH, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != self.VERSION:
+            return {}
+        return data
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.PATH), exist_ok=True)
+        with open(self.PATH, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.VERSION,
+                    "outputs": self.outputs,
+                    "digests": self.digests,
+                    "cache_refs": self.cache_refs,
+                },
+                f,
+                indent=1,
+            )
 
+    def file_hash(self, path):
+        if path not in self.hashes:
+            try:
+                with open(path, "rb") as f:
+                    self.hashes[path] = hashlib.sha256(f.read()).hexdigest()
+            except OSError:
+                self.hashes[path] = None
+        return self.hashes[path]
+
+    def config_hash(self, lang):
+        return self.file_hash(f"src/content/{lang}/config.yaml")
+
+    def template_hash(self, name, seen=None):
+        # A template's hash covers every template it extends or includes.
+        # Templates are parsed once per build, like files are hashed once.
+        if name in self.template_hashes:
+            return self.template_hashes[name]
+        seen = set() if seen is None else seen
+        seen.add(name)
+        path = os.path.join(TEMPLATES_DIR, name)
+        parts = [self.file_hash(path)]
+        with open(path, encoding="utf-8") as f:
+            ast = get_environment().parse(f.read())
+        for ref in sorted(filter(None, meta.find_referenced_templates(ast))):
+            if ref not in seen:
+                parts.append(self.template_hash(ref, seen))
+        self.template_hashes[name] = hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+        return self.template_hashes[name]
+
+    def is_current(self, path, deps):
+        key = hashlib.sha256(
+            json.dumps([self.salt, deps], default=str).encode()
+        ).hexdigest()
+        self.outputs[path] = key
+        if self.previous.get(path) == key and os.path.exists(path):
+            if path in self.previous_cache_refs:
+                self.cache_refs[path] = list(self.previous_cache_refs[path])
+            return True
+        self.rebuilt += 1
+        return False
+
+    def use_cache(self, path, *cache_paths):
+        refs = self.cache_refs.setdefault(path, [])
+        refs.extend(cache_path for cache_path in cache_paths if cache_path not in refs)
+
+    def merge_cache_refs(self, cache_refs):
+        for path, refs in cache_refs.items():
+            self.use_cache(path, *refs)
+
+    def write(self, path, data):
+        self.writer.write(path, data)
 
-def generate_robots(domain):
+    @property
+    def page_options(self):
+        return [self.minify, self.critical and self.critical.digest]
+
+    def write_page(self, path, content, kind, language):
+        # Rendered pages get their critical CSS inlined and pass through the
+        # minifier; the bytes it saves are reported for each kind of page.
+        # While Tailwind is still running, pages are set aside on disk and
+        # finished by finish_pending_pages once the stylesheet is there.
+        if self.pending_pages is not None:
+            os.makedirs(PENDING_PAGES_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=PENDING_PAGES_DIR, suffix=".html")
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(content)
+            self.pending_pages.append((tmp_path, path, kind, language))
+            return
+        css = None
+        if self.critical is not None:
+            css = self.critical.css(content, kind, language, self)
+            self.use_cache(path, self.critical.paths[(kind, language)])
+        self.write_finished_page(path, kind, *finish_page(content, css, self.minify))
+
+    def write_finished_page(self, path, kind, content, size, cache_path):
+        if cache_path is not None:
+            self.use_cache(path, cache_path)
+        if self.minify:
+            stat = self.minified.setdefault(kind, {"pages": 0, "size": 0, "minified": 0})
+            stat["pages"] += 1
+            stat["size"] += size
+            stat["minified"] += len(content.encode("utf-8"))
+        self.write(path, content)
+
+    def merge_minified(self, stats):
+        for kind, stat in stats.items():
+            total = self.minified.setdefault(kind, {"pages": 0, "size": 0, "minified": 0})
+            for field, value in stat.items():
+                total[field] += value
+
+    def copy(self, src_path, path):
+        self.writer.copy(src_path, path)
+
+    def is_linked(self, path, digest):
+        # Hard-linked outputs depend on their source alone. Its digest is
+        # recorded since a link cannot be compared with its source to
+        # tell whether the source was edited.
+        self.digests[path] = digest
+        return self.is_current(path, [digest])
+
+    def link(self, src_path, path):
+        previous = self.previous_digests.get(path)
+        changed = previous is not None and previous != self.digests[path]
+        self.writer.link(src_path, path, changed)
+
+    def remove_stale(self):
+        for path in set(self.previous) - set(self.outputs):
+            if os.path.isfile(path):
+                self.writer.remove(path)
+            directory = os.path.dirname(path)
+            while directory != "output" and os.path.isdir(directory) and not os.listdir(directory):
+                os.rmdir(directory)
+                directory = os.path.dirname(directory)
+
+
+def site_url(config):
+    url = f"https://{config['domain']}"
+    if config["language"] != DEFAULT_LANG:
+        url = f"{url}/{config['language']}"
+    return url
+
+
+def post_url(config, post):
+    return f"{site_url(config)}/articles/{post.slug}/"
+
+
+class FeedWriter:
+    # A feed is streamed item by item to a temporary file next to it, so
+    # only one post body is in memory at a time. Pages after the first are
+    # linked as an RFC 5005 paged feed.
+    NAME = None
+
+    def __init__(self, config, num_pages):
+        self.config = config
+        self.num_pages = num_pages
+        self.site_url = site_url(config)
+
+    def name(self, page):
+        if page == 1:
+            return self.NAME
+        root, ext = os.path.splitext(self.NAME)
+        return f"{root}-{page}{ext}"
+
+    def path(self, page):
+        if self.config["language"] == DEFAULT_LANG:
+            return os.path.join("output", self.name(page))
+        return os.path.join("output", self.config["language"], self.name(page))
+
+    def url(self, page):
+        return f"{self.site_url}/{self.name(page)}"
+
+    def page_links(self, page):
+        if self.num_pages == 1:
+            return {}
+        links = {"first": 1, "last": self.num_pages}
+        if page > 1:
+            links["previous"] = page - 1
+        if page < self.num_pages:
+            links["next"] = page + 1
+        return {rel: self.url(number) for rel, number in links.items()}
+
+    def write(self, posts, page, manifest):
+        path = self.path(page)
+        updated = max((post.date for post in posts), default=None)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(self.header(page, updated))
+                for index, post in enumerate(posts):
+                    f.write(self.item(post, index))
+                f.write(self.footer())
+            os.chmod(tmp_path, 0o644)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        manifest.writer.move(tmp_path, path)
+
+
+class RssFeed(FeedWriter):
+    NAME = "rss.xml"
+
+    def header(self, page, updated):
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<rss xmlns:atom="http://www.w3.org/2005/Atom" '
+            'xmlns:content="http://purl.org/rss/1.0/modules/content/" version="2.0">',
+            "  <channel>",
+            f"    <title>{escape(self.config['site_title'])}</title>",
+            f"    <link>{self.site_url}/</link>",
+            f"    <description>{escape(self.config['site_description'])}</description>",
+            f"    <language>{self.config['language']}</language>",
+            f'    <atom:link rel="self" type="application/rss+xml" href="{self.url(page)}"/>',
+        ]
+        for rel, href in self.page_links(page).items():
+            lines.append(f'    <atom:link rel="{rel}" href="{href}"/>')
+        if updated is not None:
+            lines.append(f"    <lastBuildDate>{format_datetime(updated)}</lastBuildDate>")
+        return "\n".join(lines) + "\n"
+
+    def item(self, post, index):
+        url = post_url(self.config, post)
+        lines = [
+            "    <item>",
+            f"      <title>{escape(post.title)}</title>",
+            f"      <link>{url}</link>",
+            f'      <guid isPermaLink="true">{url}</guid>',
+            f"      <description>{escape(post.summary)}</description>",
+            f"      <content:encoded>{escape(post.html)}</content:encoded>",
+        ]
+        if post.topic is not None:
+            lines.append(f"      <category>{escape(post.topic)}</category>")
+        lines.append(f"      <pubDate>{format_datetime(post.date)}</pubDate>")
+        lines.append("    </item>")
+        return "\n".join(lines) + "\n"
+
+    def footer(self):
+        return "  </channel>\n</rss>\n"
+
+
+class AtomFeed(FeedWriter):
+    NAME = "atom.xml"
+
+    def header(self, page, updated):
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            f'<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="{self.config["language"]}">',
+            f"  <id>{self.site_url}/</id>",
+            f"  <title>{escape(self.config['site_title'])}</title>",
+            f"  <subtitle>{escape(self.config['site_description'])}</subtitle>",
+            f'  <link rel="alternate" type="text/html" href="{self.site_url}/"/>',
+            f'  <link rel="self" type="application/atom+xml" href="{self.url(page)}"/>',
+        ]
+        for rel, href in self.page_links(page).items():
+            lines.append(f'  <link rel="{rel}" href="{href}"/>')
+        if updated is not None:
+            lines.append(f"  <updated>{updated.isoformat()}</updated>")
+        lines.extend(
+            [
+                "  <author>",
+                f"    <name>{escape(self.config['author_name'])}</name>",
+                f"    <email>{escape(self.config['author_email'])}</email>",
+                "  </author>",
+            ]
+        )
+        return "\n".join(lines) + "\n"
+
+    def item(self, post, index):
+        url = post_url(self.config, post)
+        lines = [
+            "  <entry>",
+            f"    <id>{url}</id>",
+            f"    <title>{escape(post.title)}</title>",
+            f'    <link rel="alternate" type="text/html" href="{url}"/>',
+            f"    <published>{post.date.isoformat()}</published>",
+            f"    <updated>{post.date.isoformat()}</updated>",
+            f"    <summary>{escape(post.summary)}</summary>",
+            f'    <content type="html">{escape(post.html)}</content>',
+        ]
+        if post.topic is not None:
+            lines.append(f'    <category term="{escape(post.topic)}"/>')
+        lines.append("  </entry>")
+        return "\n".join(lines) + "\n"
+
+    def footer(self):
+        return "</feed>\n"
+
+
+class JsonFeed(FeedWriter):
+    NAME = "feed.json"
+
+    def header(self, page, updated):
+        feed = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": self.config["site_title"],
+            "home_page_url": f"{self.site_url}/",
+            "feed_url": self.url(page),
+            "description": self.config["site_description"],
+            "language": self.config["language"],
+            "authors": [{"name": self.config["author_name"]}],
+        }
+        next_url = self.page_links(page).get("next")
+        if next_url is not None:
+            feed["next_url"] = next_url
+        # The items array is left open and filled one item at a time.
+        return json.dumps(feed, ensure_ascii=False)[:-1] + ', "items": [\n'
+
+    def item(self, post, index):
+        url = post_url(self.config, post)
+        item = {
+            "id": url,
+            "url": url,
+            "title": post.title,
+            "summary": post.summary,
+            "content_html": post.html,
+            "date_published": post.date.isoformat(),
+        }
+        if post.topic is not None:
+            item["tags"] = [post.topic]
+        separator = "" if index == 0 else ",\n"
+        return separator + json.dumps(item, ensure_ascii=False)
+
+    def footer(self):
+        return "\n]}\n"
+
+
+def generate_feeds(posts, config, manifest):
+    # The newest feed_items posts go in the main feeds; with feed_archive
+    # the older ones follow in archive pages of the same size.
+    limit = config.get("feed_items", 20)
+    posts = sorted(posts, key=lambda post: post.date, reverse=True)
+    pages = [posts[start:start + limit] for start in range(0, len(posts), limit)] or [[]]
+    if not config.get("feed_archive", False):
+        pages = pages[:1]
+
+    base_deps = [manifest.config_hash(config["language"]), len(pages)]
+    for feed_class in (RssFeed, AtomFeed, JsonFeed):
+        feed = feed_class(config, len(pages))
+        for page, page_posts in enumerate(pages, 1):
+            path = feed.path(page)
+            deps = base_deps + [post.html_cache for post in page_posts]
+            if manifest.is_current(path, deps):
+                continue
+            manifest.use_cache(path, *(post.html_cache for post in page_posts))
+            feed.write(page_posts, page, manifest)
+
+
+class SearchIndex:
+    # An inverted index per language, split into one JSON shard per
+    # two-character term prefix so the browser only fetches the shards a
+    # query needs. The terms of each post are cached by source hash, so
+    # only new or edited posts are read again.
+    VERSION = 1
+    PREFIX_LENGTH = 2
+    MIN_TERM_LENGTH = 2
+    MAX_TERM_LENGTH = 24
+    MAX_BODY_COUNT = 10
+    FIELD_WEIGHTS = {"title": 8, "tags": 6, "summary": 3}
+    # Written without accents, as terms are folded before the lookup.
+    STOP_WORDS = {
+        "en": set(
+            "about after all also an and any are as at be been but by can could did do does "
+            "for from had has have he her his how if in into is it its just me more most my "
+            "no not now of on one only or other our out so some such than that the their them "
+            "then there these they this those to too up us very was we were what when where "
+            "which who why will with would you your".split()
+        ),
+        "es": set(
+            "al algo algunos ante antes como con contra cual cuando de del desde donde durante "
+            "el ella ellas ellos en entre era es esa esas ese eso esos esta estas este esto estos "
+            "fue ha hace hasta hay la las le les lo los mas me mi muy nada ni no nos o otra otro "
+            "para pero poco por porque que quien se ser si sin sobre son su sus tambien te tiene "
+            "todo todos tu un una uno unos y ya yo".split()
+        ),
+    }
+
+    def __init__(self, lang):
+        self.lang = lang
+        self.root = "" if lang == DEFAULT_LANG else f"/{lang}"
+        self.directory = os.path.join("output", self.root.lstrip("/"), "search")
+        self.path = os.path.join(CACHE_DIR, "search", f"{lang}.json")
+        self.entries = {}
+        self.seen = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.entries = data["entries"]
+        except (OSError, ValueError):
+            pass
+
+    def tokenize(self, text):
+        text = unicodedata.normalize("NFKD", text.lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        stop_words = self.STOP_WORDS.get(self.lang, ())
+        return [
+            term
+            for term in re.findall(r"[a-z0-9]+", text)
+            if self.MIN_TERM_LENGTH <= len(term) <= self.MAX_TERM_LENGTH and term not in stop_words
+        ]
+
+    def body_text(self, post):
+        content = re.sub(r"<pre\b.*?</pre>", " ", post.html, flags=re.S)
+        return html.unescape(re.sub(r"<[^>]+>", " ", content))
+
+    def post_terms(self, post):
+        terms = self.seen.get(post.source_hash) or self.entries.get(post.source_hash)
+        if terms is None:
+            weights = {}
+            for term in self.tokenize(self.body_text(post)):
+                weights[term] = min(weights.get(term, 0) + 1, self.MAX_BODY_COUNT)
+            fields = {"title": post.title, "tags": " ".join(post.tags), "summary": post.summary}
+            for field, text in fields.items():
+                for term in self.tokenize(text):
+                    weights[term] = weights.get(term, 0) + self.FIELD_WEIGHTS[field]
+            terms = sorted(weights.items())
+        self.seen[post.source_hash] = terms
+        return terms
+
+    def save(self):
+        if self.seen.keys() != self.entries.keys():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.VERSION, "entries": self.seen}, f)
+        self.entries = self.seen
+        self.seen = {}
+
+    def generate(self, posts, manifest):
+        index_path = os.path.join(self.directory, "index.json")
+        # Documents are numbered oldest first, so publishing a new post
+        # leaves the postings of existing shards unchanged.
+        posts = sorted(posts, key=lambda post: (post.date, post.slug))
+        deps = [self.VERSION, [(post.source_hash, post.slug) for post in posts]]
+        if manifest.is_current(index_path, deps):
+            for path in manifest.previous:
+                if os.path.dirname(path) == self.directory:
+                    manifest.keep(path)
+            return
+
+        shards = {}
+        for doc, post in enumerate(posts):
+            for term, weight in self.post_terms(post):
+                shard = shards.setdefault(term[: self.PREFIX_LENGTH], {})
+                shard.setdefault(term, []).extend((doc, weight))
+        self.save()
+
+        index = {
+            "docs": [
+                [post.title, f"{self.root}/articles/{post.slug}/", post.formatted_date]
+                for post in posts
+            ],
+            "shards": sorted(shards),
+            "stop_words": sorted(self.STOP_WORDS.get(self.lang, ())),
+        }
+        manifest.write(index_path, json.dumps(index, ensure_ascii=False, separators=(",", ":")))
+        for prefix, shard in shards.items():
+            data = json.dumps(shard, sort_keys=True, separators=(",", ":"))
+            path = os.path.join(self.directory, f"{prefix}.json")
+            if not manifest.is_current(path, [hashlib.sha256(data.encode()).hexdigest()]):
+                manifest.write(path, data)
+
+
+class RelatedPosts:
+    # Posts are compared as TF-IDF vectors of their search terms, so the
+    # title, tags and summary weigh more than the body. Similarities are
+    # computed a batch of rows at a time, and the neighbours of every post
+    # are cached by a hash of the whole corpus.
+    VERSION = 1
+    # The vectors are dense, so the vocabulary is capped to keep the
+    # similarity products cheap at thousands of posts.
+    MAX_FEATURES = 512
+    BATCH_SIZE = 512
+
+    def __init__(self, lang, count):
+        self.count = count
+        self.path = os.path.join(CACHE_DIR, "related", f"{lang}.json")
+
+    def vectors(self, posts, search_index):
+        terms = [search_index.post_terms(post) for post in posts]
+        document_frequency = {}
+        for post_terms in terms:
+            for term, _ in post_terms:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        # Terms found in a single post cannot relate it to another one; of
+        # the others, those shared by many posts but not by most are kept.
+        total = len(posts)
+        features = sorted(
+            (term for term, frequency in document_frequency.items() if frequency > 1),
+            key=lambda term: (
+                -document_frequency[term] * math.log(total / document_frequency[term]),
+                term,
+            ),
+        )[: self.MAX_FEATURES]
+        columns = {term: column for column, term in enumerate(features)}
+        rows, cols, weights = [], [], []
+        for row, post_terms in enumerate(terms):
+            for term, weight in post_terms:
+                column = columns.get(term)
+                if column is not None:
+                    rows.append(row)
+                    cols.append(column)
+                    weights.append(weight)
+        frequency = numpy.array([document_frequency[term] for term in features], dtype=numpy.float32)
+        idf = numpy.log((1 + len(posts)) / (1 + frequency)) + 1
+        matrix = numpy.zeros((len(posts), len(features)), dtype=numpy.float32)
+        cols = numpy.array(cols, dtype=numpy.intp)
+        matrix[rows, cols] = (1 + numpy.log(numpy.array(weights, dtype=numpy.float32))) * idf[cols]
+        norms = numpy.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / numpy.maximum(norms, 1e-12)
+
+    def neighbours(self, matrix):
+        count = min(self.count, len(matrix) - 1)
+        result = []
+        for start in range(0, len(matrix), self.BATCH_SIZE):
+            scores = matrix[start:start + self.BATCH_SIZE] @ matrix.T
+            batch = numpy.arange(len(scores))
+            scores[batch, start + batch] = -1
+            top = numpy.argpartition(-scores, count - 1, axis=1)[:, :count]
+            top_scores = numpy.take_along_axis(scores, top, axis=1)
+            order = numpy.argsort(-top_scores, axis=1, kind="stable")
+            top = numpy.take_along_axis(top, order, axis=1)
+            top_scores = numpy.take_along_axis(top_scores, order, axis=1)
+            for row_top, row_scores in zip(top.tolist(), top_scores.tolist()):
+                result.append([index for index, score in zip(row_top, row_scores) if score > 0])
+        return result
+
+    def compute(self, posts, search_index):
+        # Slug to the slugs of its most similar posts, best first.
+        if numpy is None or self.count < 1 or len(posts) < 2:
+            return {}
+        posts = sorted(posts, key=lambda post: post.slug)
+        key = hashlib.sha256(
+            json.dumps(
+                [
+                    self.VERSION,
+                    SearchIndex.VERSION,
+                    self.count,
+                    [(post.slug, post.source_hash) for post in posts],
+                ]
+            ).encode()
+        ).hexdigest()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("key") == key:
+                return data["related"]
+        except (OSError, ValueError):
+            pass
+
+        neighbours = self.neighbours(self.vectors(posts, search_index))
+        related = {
+            post.slug: [posts[index].slug for index in indexes]
+            for post, indexes in zip(posts, neighbours)
+        }
+        atomic_write(self.path, json.dumps({"key": key, "related": related}).encode("utf-8"))
+        return related
+
+
+def generate_robots(domain, manifest):
     filename = os.path.join("output", "robots.txt")
+    if manifest.is_current(filename, [domain]):
+        return
 
-    with open(filename, "w") as f:
-        f.write(
-            f"""User-agent: *
+    manifest.write(
+        filename,
+        f"""User-agent: *
 Allow: /
 
-Sitemap: https://{domain}/sitemap.xml"""
-        )
+Sitemap: https://{domain}/sitemap_index.xml""",
+    )
 
 
-def generate_sitemap():
-    urlset = ET.Element(
-        "urlset",
-        xmlns="http://www.sitemaps.org/schemas/sitemap/0.9",
-        attrib={"xmlns:xhtml": "http://www.w3.org/1999/xhtml"},
-    )
+class SitemapWriter:
+    # URLs are streamed to a temporary file per shard as they come, like
+    # the feeds; a shard is closed at the protocol limits and every shard
+    # is listed in the sitemap index.
+    MAX_URLS = 50000
+    MAX_BYTES = 50 * 1024 * 1024
+    INDEX = os.path.join("output", "sitemap_index.xml")
+    HEADER = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+        'xmlns:xhtml="http://www.w3.org/1999/xhtml">\n'
+    ).encode()
+    FOOTER = b"</urlset>\n"
+
+    def __init__(self, manifest, domain):
+        self.manifest = manifest
+        self.domain = domain
+        self.shards = []
+        self.file = None
+
+    def shard_name(self, index):
+        return "sitemap.xml" if index == 0 else f"sitemap-{index + 1}.xml"
+
+    def add(self, loc, lastmod=None, alternates=()):
+        lines = [" <url>", f"  <loc>{escape(loc)}</loc>"]
+        if lastmod is not None:
+            lines.append(f"  <lastmod>{lastmod:%Y-%m-%d}</lastmod>")
+        for lang, href in alternates:
+            lines.append(
+                f'  <xhtml:link rel="alternate" hreflang="{lang}" href="{escape(href)}"/>'
+            )
+        lines.append(" </url>\n")
+        entry = "\n".join(lines).encode()
+
+        if (
+            self.file is None
+            or self.count == self.MAX_URLS
+            or self.size + len(entry) + len(self.FOOTER) > self.MAX_BYTES
+        ):
+            self.close_shard()
+            self.open_shard()
+        self.write(entry)
+        self.count += 1
+        if lastmod is not None and (self.lastmod is None or lastmod > self.lastmod):
+            self.lastmod = lastmod
+
+    def write(self, data):
+        self.file.write(data)
+        self.hash.update(data)
+        self.size += len(data)
+
+    def open_shard(self):
+        os.makedirs("output", exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir="output")
+        self.file = os.fdopen(fd, "wb")
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.write(self.HEADER)
+        self.count = 0
+        self.lastmod = None
+
+    def close_shard(self):
+        if self.file is None:
+            return
+        self.write(self.FOOTER)
+        self.file.close()
+        self.file = None
+        os.chmod(self.tmp_path, 0o644)
+        name = self.shard_name(len(self.shards))
+        path = os.path.join("output", name)
+        if self.manifest.is_current(path, [self.hash.hexdigest()]):
+            os.remove(self.tmp_path)
+        else:
+            self.manifest.writer.move(self.tmp_path, path)
+        self.shards.append((name, self.lastmod))
+
+    def discard(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            os.remove(self.tmp_path)
+
+    def close(self):
+        if not self.shards and self.file is None:
+            self.open_shard()
+        self.close_shard()
+
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+        ]
+        for name, lastmod in self.shards:
+            lines.append(" <sitemap>")
+            lines.append(f"  <loc>https://{escape(self.domain)}/{name}</loc>")
+            if lastmod is not None:
+                lines.append(f"  <lastmod>{lastmod:%Y-%m-%d}</lastmod>")
+            lines.append(" </sitemap>")
+        lines.append("</sitemapindex>\n")
+        self.publish(self.INDEX, "\n".join(lines).encode())
+
+    def publish(self, path, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.manifest.is_current(path, [digest]):
+            self.manifest.write(path, data)
+
+
+def translations(sites):
+    # Posts are translations of each other when they share a
+    # translation_key, which defaults to their publication date. Keys used
+    # by more than one post of a language are ambiguous and left out.
+    groups = {}
+    for config, posts in sites:
+        for post in posts:
+            group = groups.setdefault(post.translation_key, {})
+            group.setdefault(config["language"], []).append(post_url(config, post))
+    alternates = {}
+    for key, group in groups.items():
+        urls = {lang: group_urls[0] for lang, group_urls in group.items() if len(group_urls) == 1}
+        if len(urls) > 1:
+            alternates[key] = hreflang_links(urls)
+    return alternates
+
+
+def hreflang_links(urls):
+    links = sorted(urls.items())
+    if DEFAULT_LANG in urls:
+        links.append(("x-default", urls[DEFAULT_LANG]))
+    return links
+
+
+def generate_sitemap(sites, manifest):
+    domain = sites[-1][0]["domain"] if sites else ""
+    writer = SitemapWriter(manifest, domain)
+    post_alternates = translations(sites)
+    listings = {
+        path: hreflang_links({config["language"]: f"{site_url(config)}{path}" for config, _ in sites})
+        for path in ("/", "/articles/", "/projects/")
+    }
+
+    try:
+        for config, posts in sites:
+            base_url = site_url(config)
+            newest = max((post.date for post in posts), default=None)
+            writer.add(f"{base_url}/", newest, listings["/"])
+            writer.add(f"{base_url}/articles/", newest, listings["/articles/"])
+            writer.add(f"{base_url}/projects/", None, listings["/projects/"])
+            for post in posts:
+                writer.add(
+                    post_url(config, post),
+                    post.date,
+                    post_alternates.get(post.translation_key, ()),
+                )
+    except BaseException:
+        writer.discard()
+        raise
+    writer.close()
 
-    pages = []
-    for lang in LANGUAGES:
-        config = load_config(lang)
-        posts = load_posts(lang)
-        base_url = f"https://{config.get('domain')}"
 
-        if lang != DEFAULT_LANG:
-            base_url = f"{base_url}/{lang}"
+def clean_output_directory():
+    if os.path.exists("output"):
+        shutil.rmtree("output")
 
-        for post in posts:
-            pages.append(
-                {
-                    "url": f"{base_url}/articles/{post.slug}",
-                    "last_mod": post.date.strftime("%Y-%m-%d"),
-                }
-            )
 
-        pages.append(
-            {"url": f"{base_url}/articles", "last_mod": CURRENT_DATE.strftime("%Y-%m-%d")}
-        )
-        pages.append(
-            {"url": f"{base_url}/projects", "last_mod": CURRENT_DATE.strftime("%Y-%m-%d")}
-        )
+def copy_tree(src_dir, dest_dir, manifest):
+    for root, _, files in os.walk(src_dir):
+        for name in files:
+            src_path = os.path.join(root, name)
+            dest_path = os.path.join(dest_dir, os.path.relpath(src_path, src_dir))
+            if manifest.is_linked(dest_path, manifest.file_hash(src_path)):
+                continue
+            manifest.link(src_path, dest_path)
 
-    for page in pages:
-        url = ET.SubElement(urlset, "url")
 
-        ET.SubElement(url, "loc").text = page["url"]
-        ET.SubElement(url, "lastmod").text = page["last_mod"]
+def responsive_images(assets):
+    # The images picture() shows, and the widths to resize them to, from
+    # the config of every language.
+    images = set()
+    widths = set()
+    for lang in LANGUAGES:
+        settings = load_config(lang).get("responsive_images") or {}
+        images.update(assets.name(image) for image in settings.get("images", []))
+        widths.update(settings.get("widths", Assets.IMAGE_WIDTHS))
+    return images, sorted(widths)
+
+
+def copy_static_files(manifest):
+    images, widths = responsive_images(manifest.assets)
+    for root, _, files in os.walk(Assets.SOURCE_DIR):
+        for filename in sorted(files):
+            src_path = os.path.join(root, filename)
+            name = os.path.relpath(src_path, Assets.SOURCE_DIR).replace(os.sep, "/")
+            digest = manifest.file_hash(src_path)
+            hashed_path = manifest.assets.add(name, digest)
+            if name in images:
+                manifest.assets.add_variants(name, src_path, digest, widths)
+            for dest_path in (os.path.join(Assets.OUTPUT_DIR, name), hashed_path):
+                if not manifest.is_linked(dest_path, digest):
+                    manifest.link(src_path, dest_path)
+
+
+def render_image_variant(job):
+    src_path, width, fmt, cache_path = job
+    with Image.open(src_path) as image:
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    height = max(1, round(image.height * width / image.width))
+    if width != image.width:
+        image = image.resize((width, height), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, fmt, **Assets.IMAGE_FORMATS[fmt][1])
+    atomic_write(cache_path, buffer.getvalue())
+
+
+def generate_image_variants(manifest):
+    reused = 0
+    jobs = {}
+    pending = []
+    for src_path, width, fmt, cache_path, path in manifest.assets.image_jobs:
+        manifest.use_cache(path, cache_path)
+        # Cache files are named after their content.
+        if manifest.is_linked(path, cache_path):
+            reused += 1
+            continue
+        if os.path.exists(cache_path):
+            reused += 1
+        else:
+            jobs[cache_path] = (src_path, width, fmt, cache_path)
+        pending.append((cache_path, path))
 
-    xml_str = ET.tostring(urlset, encoding="utf-8", method="xml")
-    reparsed = xml.dom.minidom.parseString(xml_str)
-    filename = os.path.join("output", "sitemap.xml")
+    if len(jobs) > 1:
+        manifest.writer.flush()
+        with ProcessPoolExecutor() as executor:
+            list(executor.map(render_image_variant, jobs.values()))
+    else:
+        list(map(render_image_variant, jobs.values()))
 
-    with open(filename, "w") as f:
-        f.write(reparsed.toprettyxml(indent=" "))
+    for cache_path, path in pending:
+        manifest.link(cache_path, path)
 
+    print(f"Image variants: {reused} reused, {len(jobs)} rendered")
 
-def clean_output_directory():
-    if os.path.exists("output"):
-        shutil.rmtree("output")
 
+def generate_highlight_stylesheet(manifest):
+    data = highlight_stylesheet().encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    hashed_path = manifest.assets.add(HIGHLIGHT_STYLESHEET, digest)
+    for path in (os.path.join(Assets.OUTPUT_DIR, HIGHLIGHT_STYLESHEET), hashed_path):
+        if not manifest.is_current(path, [digest]):
+            manifest.write(path, data)
 
-def copy_static_files():
-    shutil.copytree("src/static", "output/static")
 
+def generate_asset_manifest(manifest):
+    names = manifest.assets.names
+    if manifest.is_current(Assets.MANIFEST, [names]):
+        return
+    manifest.write(Assets.MANIFEST, json.dumps(names, indent=1, sort_keys=True))
 
-def copy_public_assets(src_dir="src/public", dest_dir="output"):
-    for item in os.listdir(src_dir):
-        src_path = os.path.join(src_dir, item)
-        dest_path = os.path.join(dest_dir, item)
 
-        if os.path.isfile(src_path):
-            shutil.copy2(src_path, dest_path)
-        elif os.path.isdir(src_path):
-            shutil.copytree(src_path, dest_path)
+def copy_public_assets(manifest, src_dir="src/public", dest_dir="output"):
+    copy_tree(src_dir, dest_dir, manifest)
 
 
 def load_config(lang):
@@ -371,176 +1957,275 @@ def load_config(lang):
         return yaml.safe_load(file)
 
 
-def load_posts(lang):
+class PostCache:
+    VERSION = 3
+
+    HTML_DIR = os.path.join(CACHE_DIR, "posts", "html")
+
+    def __init__(self, lang):
+        self.path = os.path.join(CACHE_DIR, "posts", f"{lang}.json")
+        self.key = [
+            self.VERSION,
+            markdown.__version__,
+            MARKDOWN_EXTENSIONS,
+            pygments.__version__,
+            HIGHLIGHT_OPTIONS,
+        ]
+        key_digest = hashlib.sha256(json.dumps(self.key).encode()).hexdigest()[:16]
+        self.html_dir = os.path.join(self.HTML_DIR, key_digest)
+        self.entries = {}
+        self.seen = {}
+        self.dirty = False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("key") == self.key:
+                self.entries = data["entries"]
+        except (OSError, ValueError):
+            pass
+
+    def html_path(self, entry):
+        return os.path.join(self.html_dir, f"{entry['hash']}.html")
+
+    def load(self, path):
+        # Unchanged files are recognised by their stat alone; touched files
+        # are hashed and their front matter is only read again when their
+        # content changed.
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+        if (
+            entry is not None
+            and entry["mtime"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            self.seen[path] = entry
+            return entry
+
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry is None or entry["hash"] != digest:
+            entry = {"hash": digest, "meta": parse_front_matter(data.decode("utf-8"))}
+        entry.update(mtime=stat.st_mtime_ns, size=stat.st_size)
+        self.seen[path] = entry
+        self.dirty = True
+        return entry
+
+    def save(self):
+        if self.dirty or self.seen.keys() != self.entries.keys():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"key": self.key, "entries": self.seen}, f)
+        self.entries = self.seen
+        self.seen = {}
+        self.dirty = False
+
+
+def parse_front_matter(content):
+    meta_lines, _ = FullYamlMetadataPreprocessor.split_by_meta_and_content(
+        content.splitlines()
+    )
+    meta = yaml.load("\n".join(meta_lines), Loader=yaml.FullLoader)
+    date = meta["date"]
+    if isinstance(date, datetime.date):
+        date = datetime.datetime.combine(date, datetime.datetime.min.time())
+    date = date.replace(tzinfo=timezone.utc)
+    return {
+        "title": meta["title"],
+        "slug": meta["slug"],
+        "date": date.isoformat(),
+        "language": meta["language"],
+        "summary": meta["summary"],
+        "tags": meta.get("tags", []),
+    }
+
+
+def load_posts(lang, cache=None):
     posts = []
-    md = markdown.Markdown(extensions=["full_yaml_metadata", "extra"])
+    cache = cache or PostCache(lang)
+    directory = f"src/content/{lang}/posts"
 
-    for filename in os.listdir(f"src/content/{lang}/posts"):
+    for filename in sorted(os.listdir(directory)):
         if filename.endswith(".md"):
-            with open(f"src/content/{lang}/posts/{filename}", encoding="utf-8") as file:
-                content = file.read()
-                md.convert(content)
-                meta = md.Meta
-                date = meta["date"]
-                if isinstance(date, datetime.date):
-                    date = datetime.datetime.combine(date, datetime.datetime.min.time())
-                date = date.replace(tzinfo=timezone.utc)
-                post = Post(
-                    title=meta["title"],
-                    slug=meta["slug"],
-                    date=date,
-                    language=meta["language"],
-                    content=content,
-                    summary=meta["summary"],
-                    tags=meta.get("tags", []),
-                )
-                post.formatted_date = format_date(
-                    date, format="long", locale=lang
-                )
-                posts.append(post)
+            path = f"{directory}/{filename}"
+            entry = cache.load(path)
+            meta = entry["meta"]
+            date = datetime.datetime.fromisoformat(meta["date"])
+            post = Post(
+                title=meta["title"],
+                slug=meta["slug"],
+                date=date,
+                language=meta["language"],
+                summary=meta["summary"],
+                tags=meta["tags"],
+                source=path,
+            )
+            post.source_hash = entry["hash"]
+            post.html_cache = cache.html_path(entry)
+            post.translation_key = str(meta.get("translation_key", date.date()))
+            post.formatted_date = format_date(
+                date, format="long", locale=lang
+            )
+            posts.append(post)
 
+    cache.save()
     return posts
 
 
-def generate_articles(posts, config, tag=None):
-    env = Environment(loader=FileSystemLoader("src/templates"))
-    template = env.get_template("articles.html")
+def listing_path(config, tag=None, page=1):
+    parts = ["output"]
+    if config["language"] != DEFAULT_LANG:
+        parts.append(config["language"])
+    parts.append("articles")
+    if tag is not None:
+        parts.append(tag)
+    if page > 1:
+        parts.extend(["page", str(page)])
+    return os.path.join(*parts, "index.html")
 
-    posts_per_page = config["posts_per_page"]
-    num_pages = (len(posts) + posts_per_page - 1) // posts_per_page
-    
-    tag_translation = config.get("i18n").get("tag")
-    articles_translation = config.get("i18n").get("articles")
-    title = articles_translation if tag is None else f"{tag_translation}: {tag}"
 
-    for page in range(1, num_pages + 1):
-        start_index = (page - 1) * posts_per_page
-        end_index = start_index + posts_per_page
-        current_posts = posts[start_index:end_index]
-
-        if tag is not None:
-            if config["language"] == DEFAULT_LANG:
-                if page == 1:
-                    folder_path = os.path.join("output", "articles", tag)
-                else:
-                    folder_path = os.path.join("output", "articles", tag, "page", str(page))
-            else:
-                if page == 1:
-                    folder_path = os.path.join("output", config["language"], "articles", tag)
-                else:
-                    folder_path = os.path.join(
-                        "output", config["language"], "articles", tag, "page", str(page)
-                    )
-        else:
-            if config["language"] == DEFAULT_LANG:
-                if page == 1:
-                    folder_path = os.path.join("output", "articles")
-                else:
-                    folder_path = os.path.join("output", "articles", "page", str(page))
-            else:
-                if page == 1:
-                    folder_path = os.path.join("output", config["language"], "articles")
-                else:
-                    folder_path = os.path.join(
-                        "output", config["language"], "articles", "page", str(page)
-                    )
-
-        output_path = os.path.join(folder_path, "index.html")
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-        with open(output_path, "w", encoding="utf-8") as file:
-            file.write(
-                template.render(
-                    posts=current_posts,
-                    config=config,
-                    title=title,
-                    page=page,
-                    num_pages=num_pages,
-                    current_page=page,
-                    current_year=CURRENT_YEAR,
-                    default_lang=DEFAULT_LANG,
-                    languages=LANGUAGES,
-                    og=OpenGraph(config),
-                    tag=tag,
-                    tags=get_tags(posts) if tag is None else None,
-                )
-            )
-
-    if num_pages == 0:
-        # create articles empty
-        if config["language"] == DEFAULT_LANG:
-            output_path = os.path.join("output", "articles", "index.html")
-        else:
-            output_path = os.path.join(
-                "output", config["language"], "articles", "index.html"
-            )
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-        with open(output_path, "w", encoding="utf-8") as file:
-            file.write(
-                template.render(
-                    posts=posts,
-                    config=config,
-                    title=title,
-                    page=1,
-                    num_pages=0,
-                    current_page=1,
-                    current_year=CURRENT_YEAR,
-                    default_lang=DEFAULT_LANG,
-                    languages=LANGUAGES,
-                    og=OpenGraph(config),
-                )
-            )
-
-
-def get_tags(posts):
-    tags = set()
+def build_tag_index(posts):
+    # Posts are sorted by date before indexing, so every tag list is too.
+    index = {}
     for post in posts:
         for tag in post.tags:
-            tags.add(tag)
-    return tags
+            index.setdefault(tag, []).append(post)
+    return dict(sorted(index.items(), key=lambda item: (-len(item[1]), item[0])))
 
 
-def generate_tag_pages(posts, config):
-    tags = {}
-    for post in posts:
-        for tag in post.tags:
-            if tag not in tags:
-                tags[tag] = []
-            tags[tag].append(post)
-
-    for tag, tag_posts in tags.items():
-        generate_articles(tag_posts, config, tag)
+def generate_articles(posts, config, manifest, tags=None, tag=None):
+    template = get_environment().get_template("articles.html")
+    base_deps = [
+        manifest.config_hash(config["language"]),
+        manifest.template_hash("articles.html"),
+        manifest.assets.digest,
+        manifest.page_options,
+        tags,
+        len(posts),
+    ]
 
+    posts_per_page = config["posts_per_page"]
+    num_pages = (len(posts) + posts_per_page - 1) // posts_per_page
 
-def generate_home(posts, config):
-    env = Environment(loader=FileSystemLoader("src/templates"))
-    template = env.get_template("home.html")
+    tag_translation = config.get("i18n").get("tag")
+    articles_translation = config.get("i18n").get("articles")
+    title = articles_translation if tag is None else f"{tag_translation}: {tag}"
+    chunks = generate_listing_chunks(posts, config, manifest, tag)
 
-    if config["language"] == DEFAULT_LANG:
-        output_path = os.path.join("output", "index.html")
-    else:
-        output_path = os.path.join("output", config["language"], "index.html")
+    # An empty listing still gets its first page.
+    for page in range(1, max(num_pages, 1) + 1):
+        start_index = (page - 1) * posts_per_page
+        current_posts = posts[start_index:start_index + posts_per_page]
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        output_path = listing_path(config, tag, page)
+        deps = base_deps + [page, num_pages]
+        deps.extend(post.source_hash for post in current_posts)
+        if manifest.is_current(output_path, deps):
+            continue
 
-    with open(output_path, "w", encoding="utf-8") as file:
-        file.write(
+        manifest.write_page(
+            output_path,
             template.render(
-                posts=posts[:3],
+                posts=current_posts,
                 config=config,
+                title=title,
+                page=page,
+                num_pages=num_pages,
+                current_page=page,
                 current_year=CURRENT_YEAR,
                 default_lang=DEFAULT_LANG,
                 languages=LANGUAGES,
                 og=OpenGraph(config),
-            )
+                tag=tag,
+                tags=tags,
+                post_count=len(posts),
+                chunks=chunks,
+            ),
+            "tags" if tag else "articles",
+            config["language"],
         )
 
 
-def generate_projects(config):
-    env = Environment(loader=FileSystemLoader("src/templates"))
-    template = env.get_template("projects.html")
+def output_url(path):
+    return "/" + os.path.relpath(path, "output").replace(os.sep, "/")
+
+
+def listing_item(post, config):
+    return {
+        "slug": post.slug,
+        "title": post.title,
+        "date": str(post.date),
+        "formatted_date": post.formatted_date,
+        "summary": post.summary,
+        "topic": post.topic,
+        "image": OpenGraph(config, post).image,
+    }
+
+
+def generate_listing_chunks(posts, config, manifest, tag=None):
+    # The listing as JSON for main.js to page through without reloading.
+    # Chunks are counted from the oldest post, so a new post only changes
+    # the newest one, and are named after their content so they can be
+    # cached for good; index.json lists them newest first.
+    directory = os.path.join(os.path.dirname(listing_path(config, tag)), "chunks")
+    size = config["posts_per_page"]
+    oldest_first = posts[::-1]
+    chunks = []
+    for start in range(0, len(oldest_first), size):
+        items = [listing_item(post, config) for post in reversed(oldest_first[start:start + size])]
+        data = json.dumps(items, ensure_ascii=False, separators=(",", ":"))
+        digest = hashlib.sha256(data.encode("utf-8")).hexdigest()
+        path = os.path.join(directory, f"{start // size}.{digest[:8]}.json")
+        if not manifest.is_current(path, [digest]):
+            manifest.write(path, data)
+        chunks.append({"url": output_url(path), "count": len(items)})
+
+    index_path = os.path.join(directory, "index.json")
+    data = json.dumps({"total": len(posts), "chunks": chunks[::-1]}, separators=(",", ":"))
+    if not manifest.is_current(index_path, [data]):
+        manifest.write(index_path, data)
+    return output_url(index_path)
+
+
+def generate_tag_pages(tag_index, config, manifest):
+    for tag, tag_posts in tag_index.items():
+        generate_articles(tag_posts, config, manifest, tag=tag)
+
+
+def generate_home(posts, config, manifest):
+    if config["language"] == DEFAULT_LANG:
+        output_path = os.path.join("output", "index.html")
+    else:
+        output_path = os.path.join("output", config["language"], "index.html")
+
+    deps = [
+        manifest.config_hash(config["language"]),
+        manifest.template_hash("home.html"),
+        manifest.assets.digest,
+        manifest.page_options,
+    ]
+    deps.extend(post.source_hash for post in posts[:3])
+    if manifest.is_current(output_path, deps):
+        return
+
+    template = get_environment().get_template("home.html")
+
+    manifest.write_page(
+        output_path,
+        template.render(
+            posts=posts[:3],
+            config=config,
+            current_year=CURRENT_YEAR,
+            default_lang=DEFAULT_LANG,
+            languages=LANGUAGES,
+            og=OpenGraph(config),
+        ),
+        "home",
+        config["language"],
+    )
+
 
+def generate_projects(config, manifest):
     if config["language"] == DEFAULT_LANG:
         output_path = os.path.join("output", "projects", "index.html")
     else:
@@ -548,105 +2233,620 @@ def generate_projects(config):
             "output", config["language"], "projects", "index.html"
         )
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-    with open(output_path, "w", encoding="utf-8") as file:
-        file.write(
-            template.render(
-                config=config,
-                current_year=CURRENT_YEAR,
-                default_lang=DEFAULT_LANG,
-                languages=LANGUAGES,
-                og=OpenGraph(config),
-            )
-        )
-
+    deps = [
+        manifest.config_hash(config["language"]),
+        manifest.template_hash("projects.html"),
+        manifest.assets.digest,
+        manifest.page_options,
+    ]
+    if manifest.is_current(output_path, deps):
+        return
+
+    template = get_environment().get_template("projects.html")
+
+    manifest.write_page(
+        output_path,
+        template.render(
+            config=config,
+            current_year=CURRENT_YEAR,
+            default_lang=DEFAULT_LANG,
+            languages=LANGUAGES,
+            og=OpenGraph(config),
+        ),
+        "projects",
+        config["language"],
+    )
 
-def generate_404(config):
-    env = Environment(loader=FileSystemLoader("src/templates"))
-    template = env.get_template("404.html")
 
+def generate_404(config, manifest):
     output_path = os.path.join("output", config["language"], "404.html")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    with open(output_path, "w", encoding="utf-8") as file:
-        file.write(
-            template.render(
-                config=config,
-                current_year=CURRENT_YEAR,
-                default_lang=DEFAULT_LANG,
-                og=OpenGraph(config),
-            )
-        )
-
-
-def build_site():
-    domain = ""
-    clean_output_directory()
-    copy_static_files()
-    copy_public_assets()
+    deps = [
+        manifest.config_hash(config["language"]),
+        manifest.template_hash("404.html"),
+        manifest.assets.digest,
+        manifest.page_options,
+    ]
+    if manifest.is_current(output_path, deps):
+        return
+
+    template = get_environment().get_template("404.html")
+
+    manifest.write_page(
+        output_path,
+        template.render(
+            config=config,
+            current_year=CURRENT_YEAR,
+            default_lang=DEFAULT_LANG,
+            og=OpenGraph(config),
+        ),
+        "404",
+        config["language"],
+    )
 
-    for lang in LANGUAGES:
-        config = load_config(lang)
-        posts = load_posts(lang)
-        posts.sort(key=lambda x: x.date, reverse=True)
 
-        generate_articles(posts, config)
-        generate_tag_pages(posts, config)
-        generate_home(posts, config)
-        generate_projects(config)
-        generate_404(config)
-        generate_rss(posts, config)
+def run_tailwind(output, *args, **kwargs):
+    # npx is a batch script on Windows and needs a shell to run.
+    return subprocess.Popen(
+        TAILWIND_COMMAND + ["-o", output] + list(args),
+        shell=platform.system() == "Windows",
+        text=True,
+        **kwargs,
+    )
 
-        for post in posts:
-            post.render(config)
-            post.generate_og_image(config)
 
-        domain = config.get("domain")
+# Tailwind writes here and the result goes through the output writer.
+TAILWIND_OUTPUT = os.path.join(CACHE_DIR, "tailwind", "styles.css")
+
+
+def start_css_build(manifest):
+    inputs = ["src/input.css", "tailwind.config.js", "package-lock.json"]
+    # Same files as the content globs in tailwind.config.js.
+    inputs.extend(sorted(glob.glob("src/**/*.html", recursive=True)))
+    inputs.extend(sorted(glob.glob("src/**/*.js", recursive=True)))
+    deps = [(path, manifest.file_hash(path)) for path in inputs]
+    # The stylesheet is named after its inputs since its content is only
+    # known once Tailwind is done, after the pages are rendered.
+    digest = hashlib.sha256(json.dumps(deps).encode()).hexdigest()
+    hashed_path = manifest.assets.add(STYLESHEET_NAME, digest)
+    current = [manifest.is_current(path, deps) for path in (STYLESHEET, hashed_path)]
+    if all(current):
+        return digest, None
+    return digest, run_tailwind(
+        TAILWIND_OUTPUT, "--minify", stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
 
-    generate_sitemap()
-    generate_robots(domain)
 
+def finish_css_build(process, manifest):
+    if process is None:
+        return
+    stdout, stderr = process.communicate()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode, process.args, stdout, stderr
+        )
+    manifest.copy(TAILWIND_OUTPUT, STYLESHEET)
+    manifest.copy(TAILWIND_OUTPUT, manifest.assets.path(STYLESHEET_NAME))
+
+
+def finish_pending_pages(manifest):
+    pending = manifest.pending_pages or []
+    manifest.pending_pages = None
+    # The critical rules of each template come from its first page.
+    jobs = []
+    for tmp_path, path, kind, language in pending:
+        if (kind, language) not in manifest.critical.results:
+            with open(tmp_path, encoding="utf-8") as f:
+                manifest.critical.css(f.read(), kind, language, manifest)
+        jobs.append((tmp_path, manifest.critical.results[(kind, language)], manifest.minify))
+
+    if len(jobs) > 1 and (os.cpu_count() or 1) > 1:
+        manifest.writer.flush()
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(finish_pending_page, jobs, chunksize=16))
+    else:
+        results = list(map(finish_pending_page, jobs))
+
+    for (_, path, kind, language), result in zip(pending, results):
+        manifest.use_cache(path, manifest.critical.paths[(kind, language)])
+        manifest.write_finished_page(path, kind, *result)
+
+
+def compress_file(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    # No timestamp in the header, so the same input gives the same bytes.
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=9, mtime=0) as f:
+        f.write(data)
+    compressed = {".gz": buffer.getvalue()}
+    if brotli is not None:
+        compressed[".br"] = brotli.compress(data, quality=11)
+    return path, compressed
+
+
+def compress_outputs(manifest):
+    # Text outputs get .gz and .br siblings for the web server to send as
+    # they are; a sibling is only compressed again when its source changed.
+    encodings = [".gz"] if brotli is None else [".gz", ".br"]
+    stats = {}
+    jobs = []
+    for path in sorted(manifest.outputs):
+        extension = os.path.splitext(path)[1]
+        if extension not in COMPRESS_EXTENSIONS or not os.path.isfile(path):
+            continue
+        size = os.path.getsize(path)
+        if size < COMPRESS_MIN_SIZE:
+            continue
+        stat = stats.setdefault(extension, {"files": 0, "size": 0})
+        stat["files"] += 1
+        stat["size"] += size
+        digest = manifest.file_hash(path)
+        current = [manifest.is_current(path + encoding, [digest]) for encoding in encodings]
+        if all(current):
+            for encoding in encodings:
+                stat[encoding] = stat.get(encoding, 0) + os.path.getsize(path + encoding)
+        else:
+            jobs.append(path)
 
-def build_project():
-    python_path = sys.executable
-    if platform.system() == "Windows":
-        cmd_separator = "&"
+    if len(jobs) > 1:
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(compress_file, jobs, chunksize=8))
     else:
-        cmd_separator = "&&"
+        results = list(map(compress_file, jobs))
+
+    for path, compressed in results:
+        stat = stats[os.path.splitext(path)[1]]
+        for encoding, data in compressed.items():
+            stat[encoding] = stat.get(encoding, 0) + len(data)
+            manifest.write(path + encoding, data)
+
+    print(f"Precompressed {len(jobs)} of {sum(stat['files'] for stat in stats.values())} text outputs")
+    for extension, stat in sorted(stats.items()):
+        ratios = ", ".join(
+            f"{encoding[1:]} {stat[encoding] / stat['size']:.1%}" for encoding in encodings
+        )
+        print(f"  {extension}: {stat['files']} files, {stat['size'] / 1024:.0f} KB, {ratios}")
+
+
+# Content-addressed caches, which would otherwise keep every revision of
+# every page and image ever built.
+PRUNED_CACHE_DIRS = [
+    MINIFY_CACHE_DIR,
+    HIGHLIGHT_CACHE_DIR,
+    OpenGraphImageGenerator.IMAGE_CACHE_DIR,
+    Assets.IMAGE_CACHE_DIR,
+    PostCache.HTML_DIR,
+    CriticalCss.CACHE_DIR,
+]
+
+
+def pruned_cache_dirs(manifest):
+    # Only the caches of stages that ran in this build are pruned, so a dev
+    # build, which neither minifies nor inlines critical CSS, keeps what the
+    # last full build made.
+    skipped = set()
+    if not manifest.minify:
+        skipped.add(MINIFY_CACHE_DIR)
+    if manifest.critical is None:
+        skipped.add(CriticalCss.CACHE_DIR)
+    return [directory for directory in PRUNED_CACHE_DIRS if directory not in skipped]
+
+
+def prune_caches(manifest):
+    # Keeps the cache files the current outputs were made from, directly or
+    # through another cache file, and deletes the rest.
+    refs = {**manifest.previous_cache_refs, **manifest.cache_refs}
+    live = set()
+    pending = [ref for path in manifest.outputs for ref in manifest.cache_refs.get(path, [])]
+    while pending:
+        path = pending.pop()
+        if path not in live:
+            live.add(path)
+            pending.extend(refs.get(path, []))
+    manifest.cache_refs = {
+        path: refs[path] for path in set(manifest.outputs) | live if path in refs
+    }
+
+    removed = 0
+    for directory in pruned_cache_dirs(manifest):
+        for root, dirs, files in os.walk(directory, topdown=False):
+            for name in files:
+                path = os.path.join(root, name)
+                if path not in live:
+                    os.remove(path)
+                    removed += 1
+            if root != directory and not os.listdir(root):
+                os.rmdir(root)
+    print(f"Pruned {removed} unused cache files")
+
+
+def set_template_globals(assets):
+    environment = get_environment()
+    environment.globals["asset"] = assets.url
+    environment.globals["picture"] = assets.picture
+
+
+def build_language(lang, manifest, post_cache, max_workers=None):
+    profiler = manifest.profiler
+    with profiler.stage("load_posts", lang):
+        config = load_config(lang)
+        posts = load_posts(lang, post_cache)
+        posts.sort(key=lambda x: x.date, reverse=True)
 
-    tailwind_build_command = "npx tailwindcss build -i src/input.css -o output/static/css/styles.css --minify"
-    build_command = (
-        f"{python_path} src/generator.py {cmd_separator} {tailwind_build_command}"
-    )
-    result = subprocess.run(build_command, shell=True, text=True, capture_output=True)
+    with profiler.stage("articles", lang):
+        tag_index = build_tag_index(posts)
+        tag_counts = [(tag, len(tag_posts)) for tag, tag_posts in tag_index.items()]
+        generate_articles(posts, config, manifest, tags=tag_counts)
+    with profiler.stage("tag_pages", lang):
+        generate_tag_pages(tag_index, config, manifest)
+    with profiler.stage("pages", lang):
+        generate_home(posts, config, manifest)
+        generate_projects(config, manifest)
+        generate_404(config, manifest)
+    with profiler.stage("feeds", lang):
+        generate_feeds(posts, config, manifest)
+
+    search_index = SearchIndex(lang)
+    with profiler.stage("related", lang):
+        related = RelatedPosts(lang, config.get("related_posts", 3)).compute(posts, search_index)
+        by_slug = {post.slug: post for post in posts}
+
+    og_images = []
+    with profiler.stage("posts", lang):
+        for post in posts:
+            with profiler.post(post, "render"):
+                post.render(config, manifest, [by_slug[slug] for slug in related.get(post.slug, [])])
+            og_images.append(post.og_image(config))
+    with profiler.stage("search", lang):
+        search_index.generate(posts, manifest)
+    with profiler.stage("og_images", lang):
+        generate_og_images(og_images, manifest, max_workers)
+    for post in posts:
+        if post.highlight_cache is not None:
+            manifest.use_cache(post.html_cache, *post.highlight_cache)
+    return config, posts
+
+
+def build_language_worker(job):
+    # Runs one language in a worker process with a manifest of its own.
+    # Only what the parent needs travels back: the outputs and writer
+    # results for its manifest, the profile, and the config and posts for
+    # the sitemap.
+    lang, previous, cache_refs, minify, critical, defer_pages, assets, profile, max_workers = job
+    manifest = BuildManifest(previous=previous, minify=minify, previous_cache_refs=cache_refs)
+    manifest.critical = critical
+    manifest.pending_pages = [] if defer_pages else None
+    manifest.assets = assets
+    manifest.profiler = BuildProfiler(enabled=profile)
+    manifest.profiler.start(manifest.writer)
+    set_template_globals(assets)
+    site = build_language(lang, manifest, PostCache(lang), max_workers)
+    changes = manifest.writer.flush()
+    return {
+        "site": site,
+        "outputs": manifest.outputs,
+        "cache_refs": manifest.cache_refs,
+        "rebuilt": manifest.rebuilt,
+        "changes": changes,
+        "unchanged": manifest.writer.unchanged,
+        "submitted": manifest.writer.submitted,
+        "minified": manifest.minified,
+        "pending_pages": manifest.pending_pages,
+        "stages": list(manifest.profiler.stages.values()),
+        "posts": list(manifest.profiler.posts.values()),
+    }
+
+
+def build_languages_in_parallel(manifest):
+    cpus = os.cpu_count() or 1
+    workers = min(len(LANGUAGES), cpus)
+    jobs = [
+        (
+            lang,
+            manifest.previous,
+            manifest.previous_cache_refs,
+            manifest.minify,
+            manifest.critical,
+            manifest.pending_pages is not None,
+            manifest.assets,
+            manifest.profiler.enabled,
+            max(1, cpus // workers),
+        )
+        for lang in LANGUAGES
+    ]
+    sites = []
+    with ProcessPoolExecutor(workers) as executor:
+        for result in executor.map(build_language_worker, jobs):
+            manifest.outputs.update(result["outputs"])
+            manifest.merge_cache_refs(result["cache_refs"])
+            manifest.rebuilt += result["rebuilt"]
+            manifest.writer.merge(result["changes"], result["unchanged"], result["submitted"])
+            manifest.merge_minified(result["minified"])
+            if result["pending_pages"] is not None:
+                manifest.pending_pages.extend(result["pending_pages"])
+            manifest.profiler.merge(result["stages"], result["posts"])
+            sites.append(result["site"])
+    return sites
+
+
+def cpu_time():
+    # Includes finished child processes: the process pools and Tailwind.
+    seconds = time.process_time()
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        seconds += usage.ru_utime + usage.ru_stime
+    return seconds
+
+
+def max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+class BuildProfiler:
+    REPORT_PATH = os.path.join(CACHE_DIR, "profile.json")
+    PSTATS_PATH = os.path.join(CACHE_DIR, "profile.pstats")
+
+    def __init__(self, enabled=False, cprofile=False):
+        self.enabled = enabled or cprofile
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.stages = {}
+        self.posts = {}
+
+    def start(self, writer):
+        self.writer = writer
+        self.started = (time.perf_counter(), cpu_time())
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    @contextmanager
+    def stage(self, name, language=None):
+        if not self.enabled:
+            yield
+            return
+        wall, cpu, written = time.perf_counter(), cpu_time(), self.writer.submitted
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(
+                (name, language),
+                {"name": name, "language": language, "calls": 0, "wall": 0.0, "cpu": 0.0, "bytes": 0},
+            )
+            stage["calls"] += 1
+            stage["wall"] += time.perf_counter() - wall
+            stage["cpu"] += cpu_time() - cpu
+            stage["bytes"] += self.writer.submitted - written
+            # The process peak so far, which shows the stage that raised it.
+            stage["max_rss_kb"] = max_rss_kb()
+
+    @contextmanager
+    def post(self, post, kind):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_post(post.language, post.slug, kind, time.perf_counter() - start)
+
+    def merge(self, stages, posts):
+        for stage in stages:
+            self.stages[(stage["name"], stage["language"])] = stage
+        for post in posts:
+            self.posts[(post["language"], post["slug"])] = post
+
+    def record_post(self, language, slug, kind, seconds):
+        if self.enabled:
+            self.posts.setdefault((language, slug), {"language": language, "slug": slug})[kind] = seconds
+
+    def finish(self):
+        if not self.enabled:
+            return
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            self.cprofile.dump_stats(self.PSTATS_PATH)
+        report = {
+            "wall": time.perf_counter() - self.started[0],
+            "cpu": cpu_time() - self.started[1],
+            "max_rss_kb": max_rss_kb(),
+            "stages": list(self.stages.values()),
+            "posts": list(self.posts.values()),
+        }
+        atomic_write(self.REPORT_PATH, json.dumps(report, indent=1).encode())
+
+        print(f"Profile: {report['wall']:.2f}s wall, {report['cpu']:.2f}s CPU, peak RSS {report['max_rss_kb']} KB")
+        for stage in sorted(report["stages"], key=lambda stage: -stage["wall"])[:10]:
+            name = stage["name"] if stage["language"] is None else f"{stage['name']} [{stage['language']}]"
+            print(
+                f"  {name:<28} {stage['wall']:8.3f}s wall {stage['cpu']:8.3f}s CPU "
+                f"{stage['bytes'] / 1024:9.0f} KB"
+            )
+        slowest = sorted(report["posts"], key=lambda post: -post.get("render", 0))[:3]
+        for post in slowest:
+            print(f"  slowest render: {post['slug']} [{post['language']}] {post.get('render', 0):.3f}s")
+        print(f"Profile written to {self.REPORT_PATH}")
+        if self.cprofile is not None:
+            print(f"cProfile stats written to {self.PSTATS_PATH}")
+
+
+def build_site(
+    clean=False,
+    manifest=None,
+    post_caches=None,
+    css=False,
+    compress=True,
+    profiler=None,
+    parallel=False,
+    minify=True,
+    critical_css=True,
+):
+    if clean:
+        clean_output_directory()
+    manifest = manifest or BuildManifest(clean=clean, minify=minify)
+    manifest.profiler = profiler = profiler or BuildProfiler()
+    profiler.start(manifest.writer)
+    post_caches = {} if post_caches is None else post_caches
+    # Tailwind runs in its own process while the pages are generated.
+    css_process = None
+    css_digest = None
+    with profiler.stage("start_css"):
+        if css:
+            css_digest, css_process = start_css_build(manifest)
+        else:
+            manifest.keep(STYLESHEET)
+    with profiler.stage("static_files"):
+        copy_static_files(manifest)
+        copy_public_assets(manifest)
+        generate_highlight_stylesheet(manifest)
+        generate_asset_manifest(manifest)
+    set_template_globals(manifest.assets)
+
+    if critical_css:
+        # The critical rules come from the stylesheet. When Tailwind has to
+        # run, pages are rendered meanwhile and finished after it is done.
+        # Its output only depends on its inputs, so their digest stands for
+        # the stylesheet either way.
+        if css_process is not None:
+            shutil.rmtree(PENDING_PAGES_DIR, ignore_errors=True)
+            manifest.critical = CriticalCss(TAILWIND_OUTPUT, css_digest)
+            manifest.pending_pages = []
+        else:
+            manifest.critical = CriticalCss.load(STYLESHEET, css_digest)
 
-    if result.returncode != 0:
-        print("Error executing build command:")
-        print(result.stderr)
+    with profiler.stage("languages"):
+        if parallel and len(LANGUAGES) > 1:
+            # Outputs queued so far are written before the workers fork.
+            manifest.writer.flush()
+            sites = build_languages_in_parallel(manifest)
+        else:
+            sites = [
+                build_language(lang, manifest, post_caches.setdefault(lang, PostCache(lang)))
+                for lang in LANGUAGES
+            ]
+    domain = sites[-1][0].get("domain")
+
+    with profiler.stage("image_variants"):
+        generate_image_variants(manifest)
+    with profiler.stage("sitemap"):
+        generate_sitemap(sites, manifest)
+        generate_robots(domain, manifest)
+    with profiler.stage("finish_css"):
+        finish_css_build(css_process, manifest)
+    if manifest.pending_pages is not None:
+        with profiler.stage("finish_pages"):
+            finish_pending_pages(manifest)
+    report_minified(manifest.minified)
+
+    with profiler.stage("write_outputs"):
+        manifest.writer.flush()
+    if compress:
+        with profiler.stage("compress"):
+            compress_outputs(manifest)
+            manifest.writer.flush()
+    changes = manifest.writer.flush()
+    manifest.remove_stale()
+    with profiler.stage("prune_caches"):
+        prune_caches(manifest)
+    manifest.save()
+    manifest.writer.save()
+    print(
+        f"Built {manifest.rebuilt} of {len(manifest.outputs)} outputs: "
+        f"{len(changes['added'])} added, {len(changes['changed'])} changed, "
+        f"{len(changes['removed'])} removed, {manifest.writer.unchanged} unchanged"
+    )
+    profiler.finish()
+
+
+class DevBuilder:
+    # Saves that arrive within this window are built together.
+    DEBOUNCE_SECONDS = 0.3
+
+    def __init__(self):
+        # Pages stay readable while developing.
+        self.manifest = BuildManifest(minify=False)
+        self.post_caches = {}
+        self.timeout = None
+
+    def schedule(self):
+        from tornado.ioloop import IOLoop
+
+        loop = IOLoop.current()
+        if self.timeout is not None:
+            loop.remove_timeout(self.timeout)
+        self.timeout = loop.call_later(self.DEBOUNCE_SECONDS, self.build)
+
+    def build(self):
+        self.timeout = None
+        self.manifest.begin()
+        try:
+            build_site(
+                manifest=self.manifest,
+                post_caches=self.post_caches,
+                compress=False,
+                critical_css=False,
+            )
+        except Exception:
+            self.manifest.abort()
+            traceback.print_exc()
 
 
 def serve():
     from livereload import Server
 
     server = Server()
-    build_project()
-
-    server.watch(
-        "src/**/*.html",
-        build_project,
+    builder = DevBuilder()
+    # Precompressed siblings are only needed for deploys.
+    build_site(
+        manifest=builder.manifest,
+        post_caches=builder.post_caches,
+        compress=False,
+        critical_css=False,
     )
-    server.watch("src/**/*.md", build_project)
-    server.serve(root="output", port=8000)
+    # One long-lived Tailwind watcher rebuilds the stylesheet as templates
+    # change. Its stdin is kept open so it stays alive until we exit.
+    tailwind = run_tailwind(STYLESHEET, "--watch", stdin=subprocess.PIPE)
+
+    # Sources are rebuilt in-process; the browser reloads once the
+    # rebuilt files land in output/.
+    for path in ("src/**/*.html", "src/**/*.md", "src/**/*.yaml", "src/static", "src/public"):
+        server.watch(path, builder.schedule, delay="forever")
+    server.watch("output")
+    try:
+        server.serve(root="output", port=8000)
+    finally:
+        tailwind.terminate()
 
 
 def main():
+    clean = "--clean" in sys.argv
     if len(sys.argv) > 1 and sys.argv[1] == "serve":
         serve()
-    elif len(sys.argv) > 1 and sys.argv[1] == "build":
-        build_project()
-    else:
-        build_site()
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "fonts":
+        FontProvider().download()
+        return
+    profiler = BuildProfiler(
+        enabled="--profile" in sys.argv, cprofile="--cprofile" in sys.argv
+    )
+    try:
+        build_site(
+            clean=clean,
+            css=len(sys.argv) > 1 and sys.argv[1] == "build",
+            profiler=profiler,
+            parallel=(os.cpu_count() or 1) > 1 and "--serial" not in sys.argv,
+            minify="--no-minify" not in sys.argv,
+            critical_css="--no-critical-css" not in sys.argv,
+        )
+    except subprocess.CalledProcessError as e:
+        print("Error executing build command:")
+        print(e.stderr)
+        sys.exit(e.returncode or 1)
 
 
 if __name__ == "__main__":
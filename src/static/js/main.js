@@ -117,4 +117,266 @@ ready(function () {
     langElement.textContent;
   }
 
+  const searchInput = document.getElementById("searchInput");
+  if (searchInput) {
+    setupSearch(searchInput, document.getElementById("searchResults"));
+  }
+
+  const postList = document.getElementById("postList");
+  const nextPage = document.getElementById("nextPage");
+  if (postList && nextPage) {
+    setupPagination(postList, nextPage);
+  }
+
 });
+
+/**
+ * Appends the following listing pages in place, built from the JSON chunks
+ * the generator writes next to the listing. The chunks of the next page
+ * are prefetched when the pointer reaches the link, and the link itself
+ * still works without JavaScript.
+ * @param {HTMLElement} list
+ * @param {HTMLAnchorElement} next
+ */
+function setupPagination(list, next) {
+  const perPage = Number(list.dataset.perPage);
+  const container = list.querySelector(".space-y-16");
+  const template = container.querySelector("article");
+  const nav = next.closest("nav");
+  const current = nav.querySelector("li[data-page] span");
+  const chunks = new Map();
+  const first = Number(list.dataset.page);
+  let page = first;
+  let index = null;
+  let loading = false;
+
+  const fetchJSON = (url) => fetch(url).then((response) => {
+    if (!response.ok) {
+      throw new Error(`${url}: ${response.status}`);
+    }
+    return response.json();
+  });
+
+  const loadIndex = function () {
+    if (!index) {
+      index = fetchJSON(list.dataset.chunks);
+      index.catch(() => (index = null));
+    }
+    return index;
+  };
+
+  const loadChunk = function (url) {
+    if (!chunks.has(url)) {
+      const chunk = fetchJSON(url);
+      chunk.catch(() => chunks.delete(url));
+      chunks.set(url, chunk);
+    }
+    return chunks.get(url);
+  };
+
+  // Chunks and the posts in them are both listed newest first, like the
+  // pages.
+  const loadPage = async function (number) {
+    const { chunks: entries } = await loadIndex();
+    const first = (number - 1) * perPage;
+    const last = first + perPage;
+    const parts = [];
+    let offset = 0;
+    for (const entry of entries) {
+      if (offset < last && offset + entry.count > first) {
+        const start = Math.max(first - offset, 0);
+        const end = last - offset;
+        parts.push(loadChunk(entry.url).then((items) => items.slice(start, end)));
+      }
+      offset += entry.count;
+    }
+    return (await Promise.all(parts)).flat();
+  };
+
+  const render = function (item) {
+    const article = template.cloneNode(true);
+    const link = article.querySelector("a[href]");
+    article.querySelector("h3").textContent = item.title;
+    article.querySelector(".prose p").textContent = item.summary;
+    const time = article.querySelector("time");
+    time.dateTime = item.date;
+    time.textContent = item.formatted_date;
+    link.href = link.getAttribute("href").replace(/[^/]+$/, item.slug);
+    link.querySelector(".sr-only").textContent = `, ${item.title}`;
+    return article;
+  };
+
+  next.addEventListener("mouseenter", () => {
+    loadPage(page + 1).catch(() => {});
+  });
+
+  // Every page now on screen is shown as the current one. The Previous
+  // link already leads to the page before the first of them.
+  const markShown = function () {
+    nav.querySelectorAll("li[data-page]").forEach((item) => {
+      const number = Number(item.dataset.page);
+      if (number >= first && number <= page && item.querySelector("a")) {
+        const shown = current.cloneNode(true);
+        shown.textContent = number;
+        item.replaceChildren(shown);
+      }
+    });
+  };
+
+  next.addEventListener("click", async (e) => {
+    e.preventDefault();
+    // A second click while a page is loading would append it twice.
+    if (loading) {
+      return;
+    }
+    loading = true;
+    try {
+      let items;
+      try {
+        items = await loadPage(page + 1);
+      } catch (error) {
+        window.location.href = next.href;
+        return;
+      }
+      items.forEach((item) => container.appendChild(render(item)));
+      page += 1;
+      markShown();
+      history.replaceState(null, "", next.href);
+      const { total } = await loadIndex();
+      if (page * perPage >= total) {
+        next.closest("li").remove();
+      } else {
+        next.href = next.href.replace(/\d+$/, page + 1);
+      }
+    } finally {
+      loading = false;
+    }
+  });
+}
+
+/**
+ * Prefix search over the index written by the generator. Shards are
+ * fetched the first time a query needs them and kept for later queries.
+ * @param {HTMLInputElement} input
+ * @param {HTMLElement} results
+ */
+function setupSearch(input, results) {
+  const base = input.dataset.index;
+  const shards = new Map();
+  let index = null;
+  let latest = 0;
+
+  const fetchJSON = (url) => fetch(url).then((response) => {
+    if (!response.ok) {
+      throw new Error(`${url}: ${response.status}`);
+    }
+    return response.json();
+  });
+
+  // A failed request is forgotten, so the next query tries again.
+  const loadIndex = function () {
+    if (!index) {
+      index = fetchJSON(`${base}index.json`).then((data) => ({
+        docs: data.docs,
+        shards: new Set(data.shards),
+        stopWords: new Set(data.stop_words),
+      }));
+      index.catch(() => (index = null));
+    }
+    return index;
+  };
+
+  const loadShard = function (name) {
+    if (!shards.has(name)) {
+      const shard = fetchJSON(`${base}${name}.json`);
+      shard.catch(() => shards.delete(name));
+      shards.set(name, shard);
+    }
+    return shards.get(name);
+  };
+
+  // Same folding as SearchIndex.tokenize in the generator.
+  const tokenize = (text) =>
+    text
+      .normalize("NFKD")
+      .replace(/[\u0300-\u036f]/g, "")
+      .toLowerCase()
+      .match(/[a-z0-9]+/g) || [];
+
+  const search = async function (query) {
+    const { docs, shards: names, stopWords } = await loadIndex();
+    // The last word is still being typed, so it is kept even when it is
+    // a stop word.
+    const words = tokenize(query).filter(
+      (word, i, all) => word.length >= 2 && (i === all.length - 1 || !stopWords.has(word))
+    );
+    if (words.length === 0) {
+      return null;
+    }
+    let scores = null;
+    for (const word of words) {
+      const name = word.slice(0, 2);
+      const shard = names.has(name) ? await loadShard(name) : {};
+      const matches = new Map();
+      for (const term in shard) {
+        if (!term.startsWith(word)) {
+          continue;
+        }
+        const postings = shard[term];
+        for (let i = 0; i < postings.length; i += 2) {
+          const doc = postings[i];
+          if (scores === null || scores.has(doc)) {
+            matches.set(doc, (matches.get(doc) || 0) + postings[i + 1]);
+          }
+        }
+      }
+      if (scores !== null) {
+        matches.forEach((score, doc) => matches.set(doc, score + scores.get(doc)));
+      }
+      scores = matches;
+    }
+    return [...scores]
+      .sort((a, b) => b[1] - a[1])
+      .slice(0, 10)
+      .map(([doc]) => docs[doc]);
+  };
+
+  const render = function (matches) {
+    results.replaceChildren();
+    results.classList.toggle("hidden", matches === null);
+    if (matches === null) {
+      return;
+    }
+    if (matches.length === 0) {
+      const item = document.createElement("li");
+      item.className = "text-sm text-gray-500 dark:text-gray-400";
+      item.textContent = input.dataset.noResults;
+      results.appendChild(item);
+    }
+    matches.forEach(([title, url, date]) => {
+      const item = document.createElement("li");
+      const link = document.createElement("a");
+      link.href = url;
+      link.className = "font-semibold text-slate-900 hover:text-sky-500 dark:text-white";
+      link.textContent = title;
+      const time = document.createElement("span");
+      time.className = "ml-2 text-sm text-gray-500 dark:text-gray-400";
+      time.textContent = date;
+      item.append(link, time);
+      results.appendChild(item);
+    });
+  };
+
+  input.addEventListener("input", async () => {
+    const query = ++latest;
+    let matches;
+    try {
+      matches = await search(input.value);
+    } catch (error) {
+      matches = null;
+    }
+    if (query === latest) {
+      render(matches);
+    }
+  });
+}